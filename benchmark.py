@@ -0,0 +1,394 @@
+"""Performance benchmarks for the VASTAS CFD report generator.
+
+    python benchmark.py startup                 # import / rerun latency guard
+    python benchmark.py suite -o results.json   # synthetic report builds
+    python benchmark.py compare base.json new.json
+
+Each benchmark prints a summary and exits non-zero when a budget is
+exceeded or a regression is found, so it can run as a CI gate.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(HERE, "pdfc.py")
+
+# Startup budgets (milliseconds)
+IMPORT_BUDGET_MS = 150
+RERUN_BUDGET_MS = 300
+TABLE_EDIT_BUDGET_MS = 50
+
+# Modules that must stay unloaded until a report is generated or an image is previewed
+HEAVY_MODULES = ("fpdf", "PIL")
+
+IMPORT_PROBE = """
+import json, sys, time
+import streamlit
+start = time.perf_counter()
+import pdfc
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "heavy_modules": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+def measure_import(repeat=5):
+    """Time 'import pdfc' on top of an already imported streamlit, in fresh interpreters"""
+    samples = []
+    heavy = set()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_PROBE], cwd=HERE, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["import_ms"])
+        heavy.update(result["heavy_modules"])
+    return {"import_ms": statistics.median(samples), "heavy_modules_after_import": sorted(heavy)}
+
+def measure_reruns(repeat=20):
+    """Time the first script run and subsequent reruns of the app via Streamlit's AppTest"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    start = time.perf_counter()
+    app.run()
+    first_run = time.perf_counter() - start
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "first_run_ms": first_run * 1000,
+        "rerun_median_ms": statistics.median(samples) * 1000,
+        "rerun_p90_ms": samples[int(0.9 * (len(samples) - 1))] * 1000,
+        "heavy_modules_after_reruns": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+def table_editor_app(app_dir):
+    # Script for AppTest.from_function: only the solution-parameter grid
+    # editor, i.e. what a fragment rerun after a cell edit executes
+    import sys
+    sys.path.insert(0, app_dir)
+    import pdfc
+    pdfc.initialize_session_state()
+    pdfc.table_editor("solution_parameters")
+
+def measure_table_edits(rows=500, repeat=10):
+    """Rerun latency with a `rows`-row solution parameter table: whole page vs editor fragment"""
+    from streamlit.testing.v1 import AppTest
+
+    table = [[f"Parameter {i}", str(i), "Synthetic row"] for i in range(rows)]
+    results = {"table_rows": rows}
+    for name, app in (("table_page_rerun_ms", AppTest.from_file(APP_PATH, default_timeout=60)),
+                      ("table_edit_rerun_ms", AppTest.from_function(table_editor_app, default_timeout=60, args=(HERE,)))):
+        app.run()
+        app.session_state.report_data["solution_parameters"] = [list(row) for row in table]
+        app.run()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            app.run()
+            samples.append(time.perf_counter() - start)
+        results[name] = statistics.median(samples) * 1000
+    return results
+
+def run_startup(args):
+    # Measure from the app directory, where `streamlit run` picks up .streamlit/config.toml
+    os.chdir(HERE)
+    results = measure_import(args.repeat)
+    results.update(measure_reruns(args.reruns))
+    results.update(measure_table_edits(args.table_rows))
+
+    failures = []
+    if results["import_ms"] > args.import_budget:
+        failures.append(f"import took {results['import_ms']:.1f} ms (budget {args.import_budget} ms)")
+    if results["rerun_median_ms"] > args.rerun_budget:
+        failures.append(f"median rerun took {results['rerun_median_ms']:.1f} ms (budget {args.rerun_budget} ms)")
+    if results["table_edit_rerun_ms"] > args.table_edit_budget:
+        failures.append(f"table cell edit rerun took {results['table_edit_rerun_ms']:.1f} ms "
+                        f"(budget {args.table_edit_budget} ms)")
+    for key in ("heavy_modules_after_import", "heavy_modules_after_reruns"):
+        if results[key]:
+            failures.append(f"{', '.join(results[key])} loaded during startup ({key})")
+
+    print(f"import pdfc:    {results['import_ms']:.1f} ms (budget {args.import_budget} ms)")
+    print(f"first run:      {results['first_run_ms']:.1f} ms")
+    print(f"rerun median:   {results['rerun_median_ms']:.1f} ms (budget {args.rerun_budget} ms), "
+          f"p90 {results['rerun_p90_ms']:.1f} ms")
+    print(f"{results['table_rows']}-row table: page rerun {results['table_page_rerun_ms']:.1f} ms, "
+          f"cell edit (editor fragment) {results['table_edit_rerun_ms']:.1f} ms (budget {args.table_edit_budget} ms)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+# Synthetic report scenarios: image count and resolutions, table rows, formulas
+SCENARIOS = {
+    "text_only": {},
+    "images_10_mixed": {"images": 10, "resolutions": [(1280, 720), (1920, 1080), (3840, 2160)]},
+    "images_100_mixed": {"images": 100, "resolutions": [(1280, 720), (1920, 1080), (3840, 2160)]},
+    "images_10_8k": {"images": 10, "resolutions": [(7680, 4320)]},
+    "table_5000_rows": {"table_rows": 5000},
+    "formulas_200": {"formulas": 200},
+}
+
+# ProfessionalPDFGenerator methods timed by the suite (inclusive of nested calls)
+TIMED_METHODS = (
+    "header", "footer", "add_title_page", "add_section_header", "add_section_content",
+    "add_table", "add_image_with_caption", "add_formula_box", "output_bytes",
+)
+
+# Metrics compared between runs; larger is worse for all of them
+COMPARED_METRICS = ("end_to_end_s", "warm_end_to_end_s", "peak_rss_mb", "output_bytes")
+
+LOREM = (
+    "The pressure coefficient distribution shows a stagnation region at the leading edge "
+    "followed by a favourable pressure gradient over the suction side. Flow separation "
+    "occurs near 85% chord, where the turbulent boundary layer thickens and the wall shear "
+    "stress drops below zero. "
+)
+
+def synthetic_image(width, height, seed):
+    """Deterministic contour-plot-like PNG: colour gradients with iso-bands"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    red = Image.linear_gradient("L").resize((width, height))
+    green = Image.radial_gradient("L").resize((width, height))
+    blue = red.rotate(rng.choice((90, 180, 270)), expand=False)
+    img = Image.merge("RGB", (red, green, blue))
+    draw = ImageDraw.Draw(img)
+    for _ in range(20):
+        cx, cy = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(min(width, height) // 20, min(width, height) // 3)
+        colour = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((cx - r, cy - r, cx + r, cy + r), outline=colour, width=max(1, width // 400))
+    output = io.BytesIO()
+    img.save(output, "PNG", compress_level=1)
+    return output.getvalue()
+
+def synthetic_report(images=0, resolutions=((1920, 1080),), table_rows=0, formulas=0):
+    """Build a report_data dict with every text section filled and synthetic content"""
+    import pdfc
+
+    report_data = pdfc.default_report_data()
+    report_data.update({
+        "title": "Synthetic CFD Benchmark Report",
+        "project_name": "Benchmark",
+        "analyst": "benchmark.py",
+        "company": "VASTAS",
+        "date": "2024-01-01",
+    })
+    for key in ("executive_summary", "problem_definition", "geometry_description", "mesh_details",
+                "boundary_conditions", "methodology", "results", "convergence_analysis",
+                "validation", "conclusions"):
+        report_data[key] = LOREM * 4
+    report_data["boundary_conditions_table"] = [
+        ["inlet", "Inlet", "10 m/s", "Uniform velocity"],
+        ["outlet", "Pressure Outlet", "0 Pa", "Gauge pressure"],
+        ["wing", "Wall", "No slip", "Smooth wall"],
+    ]
+    report_data["mesh_quality_data"] = [
+        [f"Metric {i}", f"{i * 0.001:.3f}", "< 0.95", "Good"] for i in range(table_rows)
+    ]
+    report_data["solution_parameters"] = [["Turbulence model", "k-omega SST", "Two-equation RANS"]]
+    report_data["result_images"] = []
+    for i in range(images):
+        width, height = resolutions[i % len(resolutions)]
+        data = synthetic_image(width, height, seed=i)
+        target = "result_images" if i % 4 else "convergence_images"
+        report_data[target].append({"file": io.BytesIO(data), "caption": f"Figure {i + 1} ({width}x{height})"})
+    report_data["formulas"] = [
+        {"description": f"Transport equation {i + 1}",
+         "formula": "$\\frac{\\partial (\\rho \\phi)}{\\partial t} + \\nabla \\cdot (\\rho U \\phi)"
+                    " = \\nabla \\cdot (\\Gamma \\nabla \\phi) + S_\\phi$\n"
+                    "where $\\Gamma = \\mu + \\mu_t / \\sigma$ is the effective diffusivity"}
+        for i in range(max(formulas, 1))
+    ]
+    return report_data
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def instrument(target, name, timings):
+    """Wrap target.name so each call adds to timings[name] = [calls, seconds]"""
+    original = getattr(target, name)
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            entry = timings.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+    setattr(target, name, timed)
+
+def run_scenario(name):
+    """Build one scenario in this process (cold image cache, then warm) and return its metrics"""
+    os.environ["PDFC_CACHE_DIR"] = tempfile.mkdtemp(prefix="pdfc-bench-")
+    import pdfc
+
+    start = time.perf_counter()
+    report_data = synthetic_report(**SCENARIOS[name])
+    # Import the PDF stack up front so builds are not charged for it
+    pdfc.pdf_generator_class()
+    setup_s = time.perf_counter() - start
+    baseline_rss = peak_rss_mb()
+
+    timings = {}
+    for method in TIMED_METHODS:
+        instrument(pdfc.ProfessionalPDFLayout, method, timings)
+    instrument(pdfc, "preprocess_report_images", timings)
+
+    start = time.perf_counter()
+    pdf = pdfc.create_professional_pdf(report_data)
+    pdf_bytes = pdf.output_bytes()
+    end_to_end = time.perf_counter() - start
+    pages = pdf.page_no()
+    cold_timings = {key: {"calls": calls, "seconds": seconds} for key, (calls, seconds) in timings.items()}
+    del pdf, pdf_bytes
+
+    # Second build: image conversions now come from the on-disk cache
+    start = time.perf_counter()
+    pdf_bytes = pdfc.create_professional_pdf(report_data).output_bytes()
+    warm_end_to_end = time.perf_counter() - start
+
+    return {
+        "scenario": name,
+        "parameters": SCENARIOS[name],
+        "setup_s": setup_s,
+        "end_to_end_s": end_to_end,
+        "warm_end_to_end_s": warm_end_to_end,
+        "pages": pages,
+        "output_bytes": len(pdf_bytes),
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "methods": cold_timings,
+    }
+
+def run_scenario_command(args):
+    print(json.dumps(run_scenario(args.name)))
+    return 0
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_suite(args):
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})", file=sys.stderr)
+        return 2
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "scenarios": {},
+    }
+    for name in names:
+        # Fresh interpreter per scenario so peak RSS is not shared between them
+        output = subprocess.run(
+            [sys.executable, "-W", "ignore", os.path.abspath(__file__), "run-scenario", name],
+            cwd=HERE, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        results["scenarios"][name] = result
+        slowest = sorted(result["methods"].items(), key=lambda item: -item[1]["seconds"])[:3]
+        print(f"{name:18s} {result['end_to_end_s']:7.2f} s (warm {result['warm_end_to_end_s']:6.2f} s)  "
+              f"{result['pages']:4d} pages  {result['output_bytes'] / 1024:9.1f} KB  "
+              f"peak RSS {result['peak_rss_mb']:7.1f} MB  | "
+              + ", ".join(f"{method} {timing['seconds']:.2f} s" for method, timing in slowest))
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+def run_compare(args):
+    with open(args.base) as f:
+        base = json.load(f)["scenarios"]
+    with open(args.new) as f:
+        new = json.load(f)["scenarios"]
+
+    regressions = 0
+    for name in sorted(set(base) & set(new)):
+        for metric in COMPARED_METRICS:
+            before, after = base[name].get(metric), new[name].get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before * 100
+            flag = ""
+            if change > args.threshold:
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"{name:18s} {metric:18s} {before:12.3f} -> {after:12.3f}  {change:+6.1f}%{flag}")
+    if regressions:
+        print(f"\n{regressions} regression(s) above {args.threshold}%", file=sys.stderr)
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    startup = subparsers.add_parser("startup", help="guard module import and script rerun latency")
+    startup.add_argument("--repeat", type=int, default=5, help="fresh-interpreter import samples")
+    startup.add_argument("--reruns", type=int, default=20, help="script reruns to time")
+    startup.add_argument("--import-budget", type=float, default=IMPORT_BUDGET_MS, help="max import time (ms)")
+    startup.add_argument("--rerun-budget", type=float, default=RERUN_BUDGET_MS, help="max median rerun time (ms)")
+    startup.add_argument("--table-rows", type=int, default=500, help="rows of the table editor benchmark")
+    startup.add_argument("--table-edit-budget", type=float, default=TABLE_EDIT_BUDGET_MS,
+                         help="max table cell edit rerun time (ms)")
+    startup.add_argument("--json", help="also write results to this JSON file")
+    startup.set_defaults(func=run_startup)
+
+    suite = subparsers.add_parser("suite", help="time synthetic report builds")
+    suite.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    suite.add_argument("-o", "--output", default="benchmark_results.json", help="JSON results file")
+    suite.set_defaults(func=run_suite)
+
+    compare = subparsers.add_parser("compare", help="compare two suite result files")
+    compare.add_argument("base", help="baseline results JSON")
+    compare.add_argument("new", help="new results JSON")
+    compare.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    compare.set_defaults(func=run_compare)
+
+    scenario = subparsers.add_parser("run-scenario", help=argparse.SUPPRESS)
+    scenario.add_argument("name", choices=sorted(SCENARIOS))
+    scenario.set_defaults(func=run_scenario_command)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
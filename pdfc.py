@@ -1,22 +1,29 @@
 import streamlit as st
-from fpdf import FPDF
-from PIL import Image
+import argparse
 import base64
+import concurrent.futures
+import contextlib
+import copy
+import csv
 import io
+import itertools
 import datetime
+import hashlib
+import json
+import math
+import mmap
 import os
+import re
+import shutil
+import sys
 import tempfile
+import threading
+import time
+import tracemalloc
 import uuid
 
-# Configure page
-st.set_page_config(
-    page_title="VASTAS Professional CFD Report Generator", 
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
 # Custom CSS for professional styling
-st.markdown("""
+APP_CSS = """
 <style>
     .main-header {
         color: #1B4F72;
@@ -91,21 +98,373 @@ st.markdown("""
         border: 1px solid #E9ECEF;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+@st.cache_resource
+def page_css():
+    """Minify the page stylesheet once per server process"""
+    lines = (line.strip() for line in APP_CSS.splitlines())
+    return ''.join(line for line in lines if line)
+
+def configure_page():
+    """Apply Streamlit page config and styling (must run before other st calls)"""
+    st.set_page_config(
+        page_title="VASTAS Professional CFD Report Generator", 
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    st.markdown(page_css(), unsafe_allow_html=True)
 
-class ProfessionalPDFGenerator(FPDF):
+class ReportProfiler:
+    """Opt-in timing and memory instrumentation for report generation.
+
+    Use as a context manager around a build and pass it to
+    create_professional_pdf. Every measured step records wall time, CPU
+    time of its own thread and the tracemalloc peak above the memory in
+    use when the step started. Steps run on image worker threads record
+    CPU time only: tracemalloc peaks are process-wide and would mix
+    concurrent images, so profile one build per process at a time (report
+    jobs run in worker processes building one report each). With
+    cprofile=True the script thread is also run under cProfile.
+    """
+    def __init__(self, trace_memory=True, cprofile=False):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.profile = None
+        if cprofile:
+            import cProfile
+            self.profile = cProfile.Profile()
+        self._started_tracing = False
+        self._local = threading.local()
+        self._started = None
+        # prepare_image info of each image, set by create_professional_pdf
+        self.image_encodings = []
+    
+    def __enter__(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._started = (time.perf_counter(), time.thread_time())
+        if self.profile:
+            self.profile.enable()
+        return self
+    
+    def __exit__(self, *exc_info):
+        if self.profile:
+            self.profile.disable()
+        wall_start, cpu_start = self._started
+        self.total = {
+            'wall_s': time.perf_counter() - wall_start,
+            'cpu_s': time.thread_time() - cpu_start,
+            'peak_kb': tracemalloc.get_traced_memory()[1] / 1024 if tracemalloc.is_tracing() else None,
+        }
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        return False
+    
+    @contextlib.contextmanager
+    def measure(self, name, kind='section', memory=True):
+        """Record wall/CPU time (and memory peak if memory=True) for one step"""
+        stack = self._local.__dict__.setdefault('stack', [])
+        memory = memory and tracemalloc.is_tracing()
+        frame = {'peak': 0, 'base': 0}
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            # Fold the enclosing step's peak so far into it before resetting
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = current
+        stack.append(frame)
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            record = {
+                'kind': kind,
+                'name': name,
+                'wall_s': time.perf_counter() - wall_start,
+                'cpu_s': time.thread_time() - cpu_start,
+                'peak_kb': None,
+            }
+            stack.pop()
+            if memory:
+                frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_kb'] = max(0, frame['peak'] - frame['base']) / 1024
+                if stack:
+                    stack[-1]['peak'] = max(stack[-1]['peak'], frame['peak'])
+            self.records.append(record)
+    
+    def to_dict(self):
+        return {'total': getattr(self, 'total', None), 'steps': self.records, 'images': self.image_encodings}
+    
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+    
+    def cprofile_bytes(self):
+        """cProfile stats in pstats' marshal format (load with pstats.Stats)"""
+        if not self.profile:
+            return None
+        import marshal
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)
+
+def profile_step(profiler, name, kind='section', memory=True):
+    """profiler.measure(...) when profiling is enabled, otherwise a no-op context"""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.measure(name, kind, memory)
+
+class FormResources:
+    """Resources used by a page chrome Form XObject.
+
+    fpdf fills in the resource dictionaries of the Form XObjects in its
+    resource catalog at output time, once fonts and images have object
+    ids, by calling get_resource_dictionary on their _blend_group.
+    """
+    # Resource indexes of chrome XObjects (painted as /I<index>)
+    FIRST_INDEX = 1000000
+    
+    def __init__(self, resources):
+        # (PDFResourceType, name) pairs found in the content stream
+        self.resources = resources
+    
+    def get_resource_dictionary(self, gfxstate_objs, pattern_objs, shading_objs, font_objs, img_objs):
+        refs = {'Font': {}, 'XObject': {}, 'ExtGState': {}}
+        for kind, name in self.resources:
+            if kind.value == 'Font':
+                refs['Font'][f'F{name}'] = font_objs[int(name)].id
+            elif kind.value == 'XObject':
+                refs['XObject'][f'I{name}'] = img_objs[int(name)].id
+            elif kind.value == 'ExtGState':
+                refs['ExtGState'][name] = gfxstate_objs[name].id
+        return '<<' + ''.join(
+            f"/{kind}<<{''.join(f'/{name} {obj_id} 0 R' for name, obj_id in sorted(objs.items()))}>>"
+            for kind, objs in refs.items() if objs
+        ) + '>>'
+
+class SpillFile:
+    """Temporary file parking bytes until the PDF is written (streaming output).
+
+    Thread-safe: image preprocessing threads park their output concurrently.
+    """
     def __init__(self):
+        self.file = tempfile.TemporaryFile(prefix='pdfc-spill-')
+        self.lock = threading.Lock()
+    
+    def park(self, data):
+        """Append data to the file and return a SpilledData handle to it"""
+        with self.lock:
+            offset = self.file.seek(0, os.SEEK_END)
+            self.file.write(data)
+        return SpilledData(self, offset, len(data))
+    
+    def read(self, offset, length):
+        with self.lock:
+            self.file.seek(offset)
+            return self.file.read(length)
+    
+    def close(self):
+        self.file.close()
+
+class SpilledData:
+    """Bytes parked in a SpillFile, read back on demand"""
+    __slots__ = ('spill', 'offset', 'length')
+    
+    def __init__(self, spill, offset, length):
+        self.spill = spill
+        self.offset = offset
+        self.length = length
+    
+    def __len__(self):
+        return self.length
+    
+    def read(self):
+        return self.spill.read(self.offset, self.length)
+
+class PDFFileWriter:
+    """Write-through stand-in for the output buffer of fpdf's OutputProducer.
+
+    fpdf appends each serialized object with `buffer += data` and takes
+    object offsets and startxref from len(buffer); this writes the data to
+    a file instead, counting it and hashing it for the document ID.
+    """
+    def __init__(self, file):
+        self.file = file
+        self.size = 0
+        self.digest = hashlib.md5(usedforsecurity=False)
+    
+    def __iadd__(self, data):
+        self.file.write(data)
+        self.size += len(data)
+        self.digest.update(data)
+        return self
+    
+    def __len__(self):
+        return self.size
+
+def streaming_output_producer(file):
+    """fpdf OutputProducer class writing the PDF into file as it is serialized.
+
+    Image data parked in a SpillFile is only read back while its object is
+    written, so one image at a time is in memory.
+    """
+    from fpdf.output import OutputProducer, PDFXObject
+    
+    class SpilledXObject(PDFXObject):
+        __slots__ = ()
+        
+        def content_stream(self):
+            return self._contents.read()
+    
+    class StreamingOutputProducer(OutputProducer):
+        def __init__(self, fpdf):
+            super().__init__(fpdf)
+            self.buffer = PDFFileWriter(file)
+        
+        def _add_image(self, info):
+            spilled = {field: info[field] for field in ('data', 'smask') if isinstance(info.get(field), SpilledData)}
+            info.update(dict.fromkeys(spilled, b''))
+            try:
+                img_obj = super()._add_image(info)
+            finally:
+                info.update(spilled)
+            for field, xobject in (('data', img_obj), ('smask', img_obj.s_mask)):
+                if field in spilled and xobject is not None:
+                    xobject.__class__ = SpilledXObject
+                    xobject._contents = spilled[field]
+                    xobject.length = len(spilled[field])
+            return img_obj
+    
+    return StreamingOutputProducer
+
+# Text fpdf's line breaker does not break like wrap_text: runs of spaces,
+# spaces starting or ending a line (but for one at the very end), other
+# whitespace, soft hyphens and zero-width spaces
+IRREGULAR_SPACING = re.compile('(^|\n) | \n|  |[^\\S \n]|[\u00ad\u200b]')
+
+class ProfessionalPDFLayout:
+    """Report layout methods of ProfessionalPDFGenerator.
+
+    Kept free of fpdf at import time so the UI can start without loading
+    the PDF stack; pdf_generator_class() mixes this into fpdf.FPDF on
+    first use.
+    """
+    # Placed widths (mm) of report figures and the header logo
+    FIGURE_WIDTH = 170
+    LOGO_WIDTH = 25
+    # Height (mm) of the axes area of vector line plots, and their series colours
+    PLOT_HEIGHT = 80
+    PLOT_COLORS = [(46, 134, 193), (231, 76, 60), (39, 174, 96), (243, 156, 18),
+                   (142, 68, 173), (22, 160, 133), (127, 140, 141), (211, 84, 0)]
+    
+    def __init__(self, image_dpi=None):
         super().__init__()
         self.set_auto_page_break(auto=True, margin=15)
         self.WIDTH = 210
         self.HEIGHT = 297
         self.company_logo = None
+        self.content_top = 0
+        # Target resolution for embedded images; None keeps source pixels
+        self.image_dpi = image_dpi
+        # Optional ReportProfiler recording per-image placement and output time
+        self.profiler = None
+        # Date printed in the footer (create_professional_pdf fixes it per report)
+        self.generated_at = datetime.datetime.now()
+        # Form XObjects of page_chrome(), by name: (index, origin, cursor offset after drawing)
+        self.chrome = {}
+        # Streaming mode (see output_file): SpillFile holding image data until
+        # output, and how many of fpdf's loaded images were moved there
+        self.spill = None
+        self.spilled_images = 0
+        # Page of each level-1 section header, in drawing order
+        self.section_header_pages = []
+        # Dry runs (see plan_report) skip drawing body text and table cells,
+        # counting the content stream bytes they would have written per page
+        # and the characters, per font, they would have used
+        self.dry_run = False
+        self.skipped_content = {}
+        self.skipped_chars = {}
         
+    def set_font(self, family=None, style='', size=0):
+        # Arial/Courier map to the Unicode TTF fonts of font_registry when available
+        if family:
+            family = font_registry.resolve(self, family, style)
+        super().set_font(family, style, size)
+    
+    def normalize_text(self, text):
+        if not self.is_ttf_font:
+            text = core_font_text(text, self.core_fonts_encoding or 'latin-1')
+        else:
+            text = unicode_font_text(text, self.current_font.cmap)
+        return super().normalize_text(text)
+    
+    def page_chrome(self, name, draw):
+        """Paint static page content from a Form XObject shared by all pages.
+
+        draw() is only called the first time, drawing at the current
+        position; the operators it emits are moved off the page into the
+        XObject. Every page then paints it with one Do, shifted to its own
+        current position, and the cursor ends where draw() left it. Font,
+        colour and line settings are back to those before the call, as Do
+        restores the graphics state.
+
+        Relies on fpdf2 2.8.5+ internals (its resource catalog of Form
+        XObjects); without them draw() just runs on every page.
+        """
+        try:
+            from fpdf.enums import PDFResourceType
+            self._resource_catalog.scan_stream
+            self._resource_catalog.form_xobjects
+        except (ImportError, AttributeError):
+            draw()
+            return
+        
+        x, y = self.get_x(), self.get_y()
+        if name not in self.chrome:
+            contents = self.pages[self.page].contents
+            start = len(contents)
+            font_set = self.current_font_is_set_on_page
+            self._push_local_stack()
+            draw()
+            self._pop_local_stack()
+            self.current_font_is_set_on_page = font_set
+            index = self.add_form_xobject(bytes(contents[start:]))
+            del contents[start:]
+            self.chrome[name] = (index, (x, y), (self.get_x() - x, self.get_y() - y))
+        index, (x0, y0), (dx, dy) = self.chrome[name]
+        if (x, y) == (x0, y0):
+            self._out(f"/I{index} Do")
+        else:
+            self._out(f"q 1 0 0 1 {(x - x0) * self.k:.2f} {(y0 - y) * self.k:.2f} cm /I{index} Do Q")
+        self._resource_catalog.add(PDFResourceType.X_OBJECT, index, self.page)
+        self.set_xy(x + dx, y + dy)
+    
+    def add_form_xobject(self, contents):
+        """Register a page-sized Form XObject painting contents; returns its /I index"""
+        from fpdf.syntax import Name, PDFArray, PDFContentStream
+        
+        catalog = self._resource_catalog
+        xobject = PDFContentStream(contents, compress=self.compress)
+        xobject.type = Name('XObject')
+        xobject.subtype = Name('Form')
+        xobject.b_box = PDFArray([0, 0, round(self.w_pt, 2), round(self.h_pt, 2)])
+        xobject._blend_group = FormResources(catalog.scan_stream(contents.decode('latin-1')))
+        # Indexes above every image index, which fpdf numbers from 1 in load order
+        index = FormResources.FIRST_INDEX + len(catalog.form_xobjects)
+        catalog.form_xobjects.append((index, xobject))
+        return index
+    
     def header(self):
+        self.page_chrome('header', self.draw_header)
+        self.content_top = self.get_y()
+    
+    def draw_header(self):
         # Company logo and header
         if self.company_logo:
             try:
-                self.image(self.company_logo, x=15, y=8, w=25)
+                self.image(self.company_logo, x=15, y=8, w=self.LOGO_WIDTH)
             except:
                 pass
         
@@ -120,14 +479,28 @@ class ProfessionalPDFGenerator(FPDF):
         self.line(20, 35, 190, 35)
         self.ln(10)
     
+    def start_new_page(self):
+        """Add a page unless the current one is still blank below the header"""
+        if self.page == 0 or self.get_y() > self.content_top:
+            self.add_page()
+    
     def footer(self):
         self.set_y(-15)
         self.set_font('Arial', 'I', 8)
         self.set_text_color(128, 128, 128)
-        self.cell(0, 10, f'Page {self.page_no()} | CFD Analysis Report | Generated on {datetime.datetime.now().strftime("%Y-%m-%d")}', 0, 0, 'C')
+        # Centred as one line; only the page number is drawn per page (on the
+        # baseline cell() would use), the rest is chrome placed right after it
+        number = f'Page {self.page_no()}'
+        suffix = f' | CFD Analysis Report | Generated on {self.generated_at.strftime("%Y-%m-%d")}'
+        number_width = self.get_string_width(number)
+        suffix_width = self.get_string_width(suffix)
+        left = self.l_margin + (self.w - self.l_margin - self.r_margin - number_width - suffix_width) / 2
+        self.text(left, self.get_y() + 5 + 0.3 * self.font_size, number)
+        self.set_x(left + number_width)
+        self.page_chrome('footer', lambda: self.cell(suffix_width, 10, suffix, 0, 0, 'C'))
     
     def add_title_page(self, report_data):
-        self.add_page()
+        self.start_new_page()
         self.ln(30)
         
         # Main title
@@ -182,6 +555,7 @@ class ProfessionalPDFGenerator(FPDF):
         
         # Add underline for main sections
         if level == 1:
+            self.section_header_pages.append(self.page)
             self.set_draw_color(52, 152, 219)
             self.line(10, self.get_y()-2, 200, self.get_y()-2)
         
@@ -190,37 +564,221 @@ class ProfessionalPDFGenerator(FPDF):
     
     def add_section_content(self, content):
         self.set_font('Arial', '', 11)
-        self.multi_cell(0, 6, content)
+        if self.dry_run and not IRREGULAR_SPACING.search(content):
+            self.reserve_text(content, 6)
+        else:
+            self.multi_cell(0, 6, content)
         self.ln(5)
     
-    def add_table(self, headers, data):
+    def reserve_text(self, text, line_height):
+        """Dry-run multi_cell(0, line_height, text): break lines and pages as it would, drawing nothing.
+
+        fpdf's line breaker re-measures the whole line for every character;
+        wrap_text gives the same lines from cached word widths as long as
+        words are separated by single spaces (see IRREGULAR_SPACING).
+        """
+        width = self.w - self.r_margin - self.x - 2 * self.c_margin
+        text = text.removesuffix(' ')
+        trailing_newline = text.endswith('\n')
+        if trailing_newline:
+            text = text[:-1]
+        for paragraph in text.split('\n'):
+            for line, _ in self.wrap_text(paragraph, width):
+                self._perform_page_break_if_need_be(line_height)
+                self.skip_content(self.TEXT_OP_BYTES + 2 * len(line), line)
+                self.y += line_height
+        self.x = self.w - self.r_margin
+        if trailing_newline:
+            self.ln(line_height)
+    
+    # Content stream bytes of one drawn table cell border and text line,
+    # beyond the text itself (about two bytes per character)
+    RECT_OP_BYTES, TEXT_OP_BYTES = 32, 40
+    
+    def skip_content(self, size, text=''):
+        """Count content a dry run leaves undrawn on the current page, in the current font"""
+        self.skipped_content[self.page] = self.skipped_content.get(self.page, 0) + size
+        if text:
+            self.skipped_chars.setdefault(self.current_font.fontkey, set()).update(text)
+    
+    # Table layout: rows sampled for column widths, cell padding and line heights (mm)
+    TABLE_SAMPLE_ROWS = 200
+    TABLE_CELL_PADDING = 2
+    TABLE_HEADER_LINE, TABLE_HEADER_MIN_HEIGHT = 5, 8
+    TABLE_ROW_LINE, TABLE_ROW_MIN_HEIGHT = 4.5, 6
+    
+    def string_width(self, text):
+        """get_string_width with a fast path for plain text and a per-document cache"""
+        widths = getattr(self.current_font, 'cw', None)
+        if widths is not None and self.font_stretching == 100 and not self.char_spacing and not self.text_shaping:
+            # Sum the font's glyph widths directly instead of going through fpdf's text fragments
+            try:
+                if self.is_ttf_font:
+                    return sum(widths[ord(char)] for char in text) * self.font_size / 1000
+                return sum(widths[char] for char in text) * self.font_size / 1000
+            except KeyError:
+                pass
+        cache = self.__dict__.setdefault('_string_widths', {})
+        key = (self.font_family, self.font_style, self.font_size_pt, text)
+        width = cache.get(key)
+        if width is None:
+            # Bound the cache for very large tables with mostly unique cells
+            if len(cache) > 100000:
+                cache.clear()
+            width = cache[key] = self.get_string_width(text)
+        return width
+    
+    def wrap_text(self, text, width):
+        """Greedy word wrap to width; returns [(line, line_width), ...]"""
+        text_width = self.string_width(text)
+        if text_width <= width:
+            return [(text, text_width)]
+        
+        space = self.string_width(' ')
+        lines, line, line_width = [], '', 0
+        for word in text.split():
+            word_width = self.string_width(word)
+            if word_width > width:
+                # Hard-break words that cannot fit on a line of their own
+                if line:
+                    lines.append((line, line_width))
+                    line, line_width = '', 0
+                for char in word:
+                    char_width = self.string_width(char)
+                    if line and line_width + char_width > width:
+                        lines.append((line, line_width))
+                        line, line_width = '', 0
+                    line += char
+                    line_width += char_width
+            elif not line:
+                line, line_width = word, word_width
+            elif line_width + space + word_width <= width:
+                line += ' ' + word
+                line_width += space + word_width
+            else:
+                lines.append((line, line_width))
+                line, line_width = word, word_width
+        if line or not lines:
+            lines.append((line, line_width))
+        return lines
+    
+    def table_column_widths(self, headers, sample_rows):
+        """Fit column widths to the page from header and sampled cell widths"""
+        available = self.WIDTH - 20
+        padding = 2 * self.TABLE_CELL_PADDING
         self.set_font('Arial', 'B', 10)
+        natural = [self.string_width(header) + padding for header in headers]
+        self.set_font('Arial', '', 9)
+        for row in sample_rows:
+            for i, item in enumerate(row):
+                natural[i] = max(natural[i], self.string_width(item) + padding)
+        
+        total = sum(natural)
+        if total <= available:
+            # Everything fits on one line: share the spare width proportionally
+            return [width * available / total for width in natural]
+        
+        # Narrow columns keep their natural width; wide ones split the rest
+        widths = [None] * len(headers)
+        remaining, open_columns = available, list(range(len(headers)))
+        while open_columns:
+            share = remaining / len(open_columns)
+            narrow = [i for i in open_columns if natural[i] <= share]
+            if not narrow:
+                for i in open_columns:
+                    widths[i] = share
+                break
+            for i in narrow:
+                widths[i] = natural[i]
+                remaining -= natural[i]
+            open_columns = [i for i in open_columns if widths[i] is None]
+        return widths
+    
+    def wrap_table_row(self, cells, widths, line_height, min_height):
+        """The cells wrapped in the current font, and the row's height"""
+        inner = [width - 2 * self.TABLE_CELL_PADDING for width in widths]
+        wrapped = [self.wrap_text(cell, width) for cell, width in zip(cells, inner)]
+        return wrapped, max(min_height, max(len(lines) for lines in wrapped) * line_height + 1.5)
+    
+    def draw_table_row(self, cells, widths, line_height, min_height, header_cells=None, header_widths=None):
+        """Draw one bordered row of centred, wrapped cells, breaking the page first if needed.
+
+        header_cells are redrawn at the top of the new page after a break.
+        """
+        wrapped, height = self.wrap_table_row(cells, widths, line_height, min_height)
+        
+        if self.get_y() + height > self.page_break_trigger:
+            font = (self.font_family, self.font_style, self.font_size_pt)
+            self.add_page()
+            if header_cells is not None:
+                self.set_font('Arial', 'B', 10)
+                self.draw_table_row(header_cells, widths, self.TABLE_HEADER_LINE, self.TABLE_HEADER_MIN_HEIGHT)
+            self.set_font(*font)
+        
+        x, y = self.l_margin, self.get_y()
+        if self.dry_run:
+            self.skip_content(sum(self.RECT_OP_BYTES + sum(self.TEXT_OP_BYTES + 2 * len(line) for line, _ in lines)
+                                  for lines in wrapped), ''.join(cells))
+            self.set_y(y + height)
+            return
+        for lines, width in zip(wrapped, widths):
+            self.rect(x, y, width, height)
+            top = y + (height - len(lines) * line_height) / 2
+            for i, (line, line_width) in enumerate(lines):
+                # Same baseline placement as fpdf's cell()
+                self.text(x + (width - line_width) / 2, top + (i + 0.5) * line_height + 0.3 * self.font_size, line)
+            x += width
+        self.set_y(y + height)
+    
+    def add_table(self, headers, data):
+        """Add a table from any iterable of rows, streaming it row by row.
+
+        Column widths are computed once from the header and the first
+        TABLE_SAMPLE_ROWS rows; later rows wrap to fit. The header row starts
+        on the page of the first row and is repeated after every page break.
+        """
+        headers = [str(header) for header in headers]
+        columns = len(headers)
+        
+        def normalize(row):
+            cells = ['' if item is None else str(item) for item in list(row)[:columns]]
+            return cells + [''] * (columns - len(cells))
         
-        # Table headers
-        col_width = (self.WIDTH - 20) / len(headers)
-        for header in headers:
-            self.cell(col_width, 8, header, 1, 0, 'C')
-        self.ln()
+        rows = (normalize(row) for row in data)
+        sample = list(itertools.islice(rows, self.TABLE_SAMPLE_ROWS))
+        widths = self.table_column_widths(headers, sample)
+        
+        # Table headers, kept on a page together with the first row
+        self.set_font('Arial', 'B', 10)
+        _, height = self.wrap_table_row(headers, widths, self.TABLE_HEADER_LINE, self.TABLE_HEADER_MIN_HEIGHT)
+        if sample:
+            self.set_font('Arial', '', 9)
+            height += self.wrap_table_row(sample[0], widths, self.TABLE_ROW_LINE, self.TABLE_ROW_MIN_HEIGHT)[1]
+            self.set_font('Arial', 'B', 10)
+        if self.get_y() + height > self.page_break_trigger:
+            self.add_page()
+        self.draw_table_row(headers, widths, self.TABLE_HEADER_LINE, self.TABLE_HEADER_MIN_HEIGHT)
         
         # Table data
         self.set_font('Arial', '', 9)
-        for row in data:
-            for item in row:
-                self.cell(col_width, 6, str(item), 1, 0, 'C')
-            self.ln()
+        for row in itertools.chain(sample, rows):
+            self.draw_table_row(row, widths, self.TABLE_ROW_LINE, self.TABLE_ROW_MIN_HEIGHT,
+                                header_cells=headers)
         self.ln(5)
     
-    def add_image_with_caption(self, image_path, caption, width=None):
-        if not os.path.exists(image_path):
+    def add_image_with_caption(self, image, caption, width=None):
+        # Images may be given as a file path or as in-memory encoded bytes
+        if isinstance(image, (str, os.PathLike)) and not os.path.exists(image):
             return
             
         try:
             if width is None:
-                width = self.WIDTH - 40
+                width = self.FIGURE_WIDTH
             
             # Add image
             x_pos = (self.WIDTH - width) / 2
-            self.image(image_path, x=x_pos, w=width)
+            with profile_step(self.profiler, f"Place image: {caption}", kind='image'):
+                self.image(image, x=x_pos, w=width)
             
             # Add caption
             self.set_font('Arial', 'I', 10)
@@ -233,60 +791,1683 @@ class ProfessionalPDFGenerator(FPDF):
             self.cell(0, 8, f"[Image could not be displayed: {caption}]", 0, 1, 'C')
             self.ln(5)
     
+    def add_line_plot(self, series, caption, x_label="", y_label="Residual", log_y=True, width=None):
+        """Draw {name: ([x...], [y...])} as a vector line plot with a legend and caption"""
+        series = {name: xy for name, xy in series.items() if xy[0]}
+        if not series:
+            return
+        if width is None:
+            width = self.FIGURE_WIDTH
+        
+        # Axes area, leaving room for tick labels, axis titles and the legend
+        legend_rows = math.ceil(len(series) / 4)
+        total_height = self.PLOT_HEIGHT + 12 + legend_rows * 5 + 13
+        if self.get_y() + total_height > self.page_break_trigger:
+            self.add_page()
+        left = (self.WIDTH - width) / 2 + 16
+        top = self.get_y() + 2
+        plot_width = width - 16
+        plot_height = self.PLOT_HEIGHT
+        
+        def transform(value):
+            return math.log10(value) if log_y else value
+        
+        xs = [x for x_values, _ in series.values() for x in x_values]
+        ys = [transform(y) for _, y_values in series.values() for y in y_values]
+        x_min, x_max = min(xs), max(xs)
+        if log_y:
+            y_min, y_max = math.floor(min(ys)), math.ceil(max(ys))
+            y_ticks = list(range(y_min, y_max + 1))
+        else:
+            y_min, y_max = min(ys), max(ys)
+            y_ticks = nice_ticks(y_min, y_max)
+        if x_max == x_min:
+            x_max = x_min + 1
+        if y_max == y_min:
+            y_max = y_min + 1
+        
+        def px(x):
+            return left + (x - x_min) / (x_max - x_min) * plot_width
+        
+        def py(y):
+            return top + plot_height - (y - y_min) / (y_max - y_min) * plot_height
+        
+        # Grid and tick labels
+        self.set_font('Arial', '', 7)
+        self.set_text_color(64, 64, 64)
+        self.set_draw_color(220, 220, 220)
+        self.set_line_width(0.1)
+        for tick in y_ticks:
+            self.line(left, py(tick), left + plot_width, py(tick))
+            label = f"1e{tick}" if log_y else f"{tick:g}"
+            self.text(left - 1.5 - self.string_width(label), py(tick) + 1, label)
+        for tick in nice_ticks(x_min, x_max):
+            self.line(px(tick), top, px(tick), top + plot_height)
+            label = f"{tick:.0f}" if float(tick).is_integer() else f"{tick:g}"
+            self.text(px(tick) - self.string_width(label) / 2, top + plot_height + 4, label)
+        
+        # Axis titles
+        self.set_font('Arial', '', 8)
+        self.text(left + (plot_width - self.string_width(x_label)) / 2, top + plot_height + 9, x_label)
+        with self.rotation(90, left - 11, top + plot_height / 2):
+            self.text(left - 11 - self.string_width(y_label) / 2, top + plot_height / 2, y_label)
+        
+        # Series, then the frame on top
+        self.set_line_width(0.3)
+        for i, (name, (x_values, y_values)) in enumerate(series.items()):
+            self.set_draw_color(*self.PLOT_COLORS[i % len(self.PLOT_COLORS)])
+            self.polyline([(px(x), py(transform(y))) for x, y in zip(x_values, y_values)])
+        self.set_draw_color(0, 0, 0)
+        self.set_line_width(0.2)
+        self.rect(left, top, plot_width, plot_height)
+        
+        # Legend, four entries per row
+        legend_top = top + plot_height + 14
+        for i, name in enumerate(series):
+            x = left + (i % 4) * plot_width / 4
+            y = legend_top + (i // 4) * 5
+            self.set_draw_color(*self.PLOT_COLORS[i % len(self.PLOT_COLORS)])
+            self.set_line_width(0.6)
+            self.line(x, y - 1, x + 6, y - 1)
+            self.text(x + 8, y, str(name))
+        self.set_draw_color(0, 0, 0)
+        self.set_line_width(0.2)
+        
+        # Add caption
+        self.set_y(legend_top + (legend_rows - 1) * 5 + 2)
+        self.set_font('Arial', 'I', 10)
+        self.set_text_color(64, 64, 64)
+        self.cell(0, 8, f"Figure: {caption}", 0, 1, 'C')
+        self.ln(5)
+        self.set_text_color(0, 0, 0)
+    
     def add_formula_box(self, description, formula):
+        # Typeset math lines; prose and lines mathtext cannot parse are printed as text
+        max_width = self.WIDTH - 50
+        lines = []
+        for line in formula.split('\n'):
+            source = formula_math_source(line)
+            outline = formula_cache.get(source) if source else None
+            if outline is None:
+                lines.append((line, None, 1, 6))
+                continue
+            width = (outline['x1'] - outline['x0']) * 25.4 / 72
+            scale = min(1, max_width / width) if width > 0 else 1
+            height = (outline['ascent'] + outline['descent']) * 25.4 / 72 * scale
+            lines.append((line, outline, scale, height + 3))
+        box_height = sum(line[3] for line in lines) + 10
+        
+        # Keep the heading (about 20 mm) on the page of its box
+        if self.get_y() + 20 + box_height > self.page_break_trigger:
+            self.start_new_page()
         self.add_section_header(description, level=2)
         
         # Formula box
         self.set_fill_color(247, 249, 249)
-        formula_lines = formula.split('\n')
-        box_height = len(formula_lines) * 6 + 10
-        
         self.rect(20, self.get_y(), self.WIDTH-40, box_height, 'F')
         self.ln(5)
         
         self.set_font('Courier', '', 10)
-        for line in formula_lines:
-            self.cell(0, 6, line, 0, 1, 'C')
+        for line, outline, scale, height in lines:
+            if outline is None:
+                self.cell(0, 6, line, 0, 1, 'C')
+            else:
+                self.draw_formula(outline, scale, self.get_y() + 1.5)
+                self.ln(height)
         
         self.ln(5)
         self.set_font('Arial', '', 11)
+    
+    def draw_formula(self, outline, scale, top):
+        """Fill a cached formula outline, centred on the page, its top at y=top (mm)"""
+        factor = scale * 25.4 / 72
+        left = (self.w - (outline['x1'] - outline['x0']) * factor) / 2
+        # Outline units are points with y up; place its baseline in page points
+        x = (left - outline['x0'] * factor) * self.k
+        y = (self.h - top) * self.k - outline['ascent'] * scale
+        self._out(f"q 0 g {scale:.4f} 0 0 {scale:.4f} {x:.2f} {y:.2f} cm\n{outline['ops']}\nf Q")
+    
+    def image(self, name, *args, **kwargs):
+        if isinstance(name, ImagePlaceholder):
+            return self.reserve_image(name, *args, **kwargs)
+        # Images parked in the spill file are read back just to be placed
+        if isinstance(name, SpilledData):
+            name = name.read()
+        info = super().image(name, *args, **kwargs)
+        if self.spill is not None:
+            self.spill_images()
+        return info
+    
+    def reserve_image(self, placeholder, x=None, y=None, w=0, h=0, **kwargs):
+        """Dry-run image(): move the cursor as fpdf places the image, drawing nothing"""
+        if w == 0 and h == 0:
+            w, h = placeholder.width / self.k, placeholder.height / self.k
+        elif w == 0:
+            w = h * placeholder.width / placeholder.height
+        elif h == 0:
+            h = w * placeholder.height / placeholder.width
+        if y is None:
+            self._perform_page_break_if_need_be(h)
+            self.y += h
+        return {'rendered_width': w, 'rendered_height': h}
+    
+    def spill_images(self):
+        """Move the data of newly loaded images from fpdf's image cache to the spill file"""
+        images = list(self.image_cache.images.values())
+        for info in images[self.spilled_images:]:
+            for field in ('data', 'smask'):
+                if isinstance(info.get(field), (bytes, bytearray)):
+                    info[field] = self.spill.park(info[field])
+        self.spilled_images = len(images)
+    
+    def _default_file_id(self, buffer):
+        # fpdf hashes the output buffer; streamed output was hashed while written
+        if not isinstance(buffer, PDFFileWriter):
+            return super()._default_file_id(buffer)
+        id_hash = buffer.digest.copy()
+        if self.creation_date:
+            id_hash.update(self.creation_date.strftime("%Y%m%d%H%M%S").encode('utf8'))
+        hash_hex = id_hash.hexdigest().upper()
+        return f"<{hash_hex}><{hash_hex}>"
+    
+    def output_file(self, path):
+        """Write the document to path, serializing it straight into the file.
+
+        Same bytes as output_bytes(), but the PDF is never held in memory as
+        a whole. With a spill file (create_professional_pdf(streaming=True))
+        image data is read back one image at a time, so peak memory does
+        not grow with the image count. Returns the file size.
+        """
+        with profile_step(self.profiler, "PDF output", kind='stage'):
+            try:
+                with open(path, 'wb') as f:
+                    size = len(self.output(output_producer_class=streaming_output_producer(f)))
+            finally:
+                if self.spill is not None:
+                    self.spill.close()
+        return size
+    
+    def output_bytes(self):
+        """Render the document in memory and return it as bytes.
+
+        fpdf builds the file in a bytearray; it is swapped for the returned
+        bytes object so only one copy of the PDF stays alive.
+        """
+        with profile_step(self.profiler, "PDF output", kind='stage'):
+            self.buffer = bytes(self.output())
+        return self.buffer
 
-def save_uploaded_image(uploaded_file, temp_dir):
-    """Save uploaded image to temporary directory and return path"""
-    if uploaded_file is None:
+def nice_ticks(low, high, count=6):
+    """Round tick values (1, 2 or 5 x 10^n apart) covering [low, high]"""
+    span = high - low
+    if span <= 0:
+        return [low]
+    step = 10 ** math.floor(math.log10(span / count))
+    for multiple in (1, 2, 5, 10):
+        if span / (step * multiple) <= count:
+            step *= multiple
+            break
+    first = math.ceil(low / step)
+    return [tick * step for tick in range(first, math.floor(high / step) + 1)]
+
+def pdf_generator_class():
+    """Import fpdf and build ProfessionalPDFGenerator on first use"""
+    global ProfessionalPDFGenerator
+    if 'ProfessionalPDFGenerator' not in globals():
+        from fpdf import FPDF
+        
+        class ProfessionalPDFGenerator(ProfessionalPDFLayout, FPDF):
+            pass
+        # Module-level name, so instances pickle like a top-level class
+        ProfessionalPDFGenerator.__qualname__ = 'ProfessionalPDFGenerator'
+    return ProfessionalPDFGenerator
+
+def __getattr__(name):
+    # Lazy module attribute: pdfc.ProfessionalPDFGenerator imports fpdf on access
+    if name == 'ProfessionalPDFGenerator':
+        return pdf_generator_class()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# On-disk caches for converted images, UI thumbnails, rendered sections,
+# finished reports and parsed residual logs, shared across reruns, sessions and batch workers
+CACHE_DIR = os.environ.get('PDFC_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'vastas-pdfc'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('PDFC_IMAGE_CACHE_MB', '1024')) * 1024 * 1024
+SECTION_CACHE_MAX_BYTES = int(os.environ.get('PDFC_SECTION_CACHE_MB', '256')) * 1024 * 1024
+RESIDUAL_CACHE_MAX_BYTES = int(os.environ.get('PDFC_RESIDUAL_CACHE_MB', '64')) * 1024 * 1024
+THUMBNAIL_CACHE_MAX_BYTES = int(os.environ.get('PDFC_THUMBNAIL_CACHE_MB', '64')) * 1024 * 1024
+REPORT_CACHE_MAX_BYTES = int(os.environ.get('PDFC_REPORT_CACHE_MB', '512')) * 1024 * 1024
+
+# Encoding applied by prepare_image; part of every cache key. Images with at
+# most palette_colors colours become lossless palette PNGs, anti-aliased plots
+# with up to plot_colors colours are quantized to such a palette, and
+# continuous-tone renders become JPEGs.
+IMAGE_ENCODING = {'version': 3, 'jpeg_quality': 80, 'palette_colors': 256, 'plot_colors': 4096, 'png_level': 6}
+# Dry runs estimate images not encoded yet at no more than this (about a
+# detailed render as a quality-80 JPEG)
+ESTIMATED_BYTES_PER_PIXEL = 0.25
+
+# Image resolution presets offered per report (None keeps source pixels)
+IMAGE_DPI_PRESETS = {
+    "Screen (150 dpi)": 150,
+    "Print (300 dpi)": 300,
+    "High-quality print (600 dpi)": 600,
+    "Original resolution": None,
+}
+
+def target_pixel_width(width_mm, dpi):
+    """Pixel width needed to place an image width_mm wide at dpi"""
+    if not dpi:
         return None
+    return max(1, round(width_mm / 25.4 * dpi))
+
+class ContentCache:
+    """Content-addressed file cache with a size cap and LRU eviction.
+
+    Entries are keyed by a hash of the source bytes plus the conversion
+    (or rendering) parameters. A hit refreshes the entry's mtime, which eviction uses as
+    the last-access time.
+    """
+    def __init__(self, directory, max_bytes, suffix='.jpg'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._total_bytes = None
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(data, params):
+        digest = hashlib.sha256(data)
+        digest.update(json.dumps(params, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()
     
+    @staticmethod
+    def file_digest(path):
+        """sha256 hex digest of a file's contents, hashed without reading it whole"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def path_for(self, key):
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+    
+    def get(self, key):
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+    
+    def read(self, key):
+        """Return the cached bytes for key, or None on a miss"""
+        path = self.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def put(self, key, data):
+        return self._store(key, lambda f: f.write(data))
+    
+    def put_file(self, key, source_path):
+        """put() the contents of a file, copied without reading it into memory"""
+        def copy(f):
+            with open(source_path, 'rb') as source:
+                shutil.copyfileobj(source, f)
+        return self._store(key, copy)
+    
+    def _store(self, key, write):
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            write(f)
+            size = f.tell()
+        os.replace(tmp_path, path)
+        
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, _, size in self._entries())
+            else:
+                self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self.evict()
+        return path
+    
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits its cap"""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+image_cache = ContentCache(os.path.join(CACHE_DIR, 'images'), IMAGE_CACHE_MAX_BYTES, suffix='.img')
+section_cache = ContentCache(os.path.join(CACHE_DIR, 'sections'), SECTION_CACHE_MAX_BYTES, suffix='.pdf')
+residual_cache = ContentCache(os.path.join(CACHE_DIR, 'residuals'), RESIDUAL_CACHE_MAX_BYTES, suffix='.json')
+thumbnail_cache = ContentCache(os.path.join(CACHE_DIR, 'thumbnails'), THUMBNAIL_CACHE_MAX_BYTES, suffix='.thumb')
+report_cache = ContentCache(os.path.join(CACHE_DIR, 'reports'), REPORT_CACHE_MAX_BYTES, suffix='.pdf')
+
+# Unicode TTF fonts replacing the core Arial/Courier fonts when available
+# (DejaVu, searched in PDFC_FONT_DIR, ./fonts, system font folders and
+# matplotlib's bundled fonts). Only the styles the report uses are listed;
+# without them, or with PDFC_UNICODE_FONTS=0, the core fonts are used.
+# Characters a font has no glyph for are transliterated either way.
+UNICODE_FONTS = os.environ.get('PDFC_UNICODE_FONTS', '1') != '0'
+UNICODE_FONT_FILES = {
+    'sans': {'': 'DejaVuSans.ttf', 'B': 'DejaVuSans-Bold.ttf', 'I': 'DejaVuSans-Oblique.ttf'},
+    'mono': {'': 'DejaVuSansMono.ttf'},
+}
+FONT_GROUPS = {'arial': 'sans', 'courier': 'mono'}
+CORE_FONT_FALLBACK = {'sans': 'helvetica', 'mono': 'courier'}
+FONT_METRICS_VERSION = 2
+FONT_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# Replacements for common technical symbols the core fonts cannot encode
+CORE_FONT_SUBSTITUTES = {
+    '∇': 'nabla', '∂': 'd', '∆': 'Delta', '∑': 'sum', '∫': 'int', '√': 'sqrt', '∞': 'inf',
+    '≈': '~', '≠': '!=', '≤': '<=', '≥': '>=', '→': '->', '←': '<-', '⋅': '·', '∙': '·',
+    '–': '-', '—': '-', '−': '-', '‘': "'", '’': "'", '“': '"', '”': '"', '…': '...',
+    '′': "'", '″': "''", '⁻': '-', '₀': '0', '₁': '1', '₂': '2', '₃': '3', 'μ': 'µ',
+}
+
+def font_directories():
+    """Directories searched for UNICODE_FONT_FILES, in priority order"""
+    directories = [
+        os.environ.get('PDFC_FONT_DIR', ''),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts'),
+        '/usr/share/fonts/truetype/dejavu',
+        '/usr/share/fonts/dejavu',
+        '/usr/share/fonts/TTF',
+        '/Library/Fonts',
+        os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+    ]
+    # matplotlib ships DejaVu; locate it without importing matplotlib
+    import importlib.util
+    spec = importlib.util.find_spec('matplotlib')
+    if spec is not None and spec.origin:
+        directories.append(os.path.join(os.path.dirname(spec.origin), 'mpl-data', 'fonts', 'ttf'))
+    return [directory for directory in directories if directory and os.path.isdir(directory)]
+
+def core_font_text(text, encoding='latin-1'):
+    """Make text encodable in a core font: known symbols are spelled out,
+    Greek letters named, anything else replaced with '?'"""
     try:
-        # Generate unique filename
-        file_extension = uploaded_file.name.split('.')[-1]
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        img_path = os.path.join(temp_dir, unique_filename)
-        
-        # Open and save image
-        img = Image.open(uploaded_file)
-        # Convert to RGB if necessary
-        if img.mode in ('RGBA', 'P'):
+        text.encode(encoding)
+        return text
+    except UnicodeEncodeError:
+        pass
+    
+    characters = []
+    for char in text:
+        try:
+            char.encode(encoding)
+            characters.append(char)
+        except UnicodeEncodeError:
+            characters.append(font_substitute(char))
+    return ''.join(characters)
+
+def unicode_font_text(text, cmap):
+    """Make text printable in a TTF font: characters it has no glyph for
+    (fpdf would drop them) are replaced as in core_font_text"""
+    missing = [char for char in set(text)
+               if ord(char) not in cmap and char.isprintable() and not char.isspace()]
+    for char in missing:
+        text = text.replace(char, font_substitute(char))
+    return text
+
+def font_substitute(char):
+    """Replacement for a character a font cannot print"""
+    substitute = CORE_FONT_SUBSTITUTES.get(char)
+    if substitute is not None:
+        return substitute
+    import unicodedata
+    
+    name = unicodedata.name(char, '')
+    if name.startswith('GREEK SMALL LETTER '):
+        return name[len('GREEK SMALL LETTER '):].lower()
+    if name.startswith('GREEK CAPITAL LETTER '):
+        return name[len('GREEK CAPITAL LETTER '):].title()
+    return '?'
+
+class FontRegistry:
+    """Unicode TTF fonts shared by every document of the process.
+
+    Each font file is stripped once of hinting and layout tables (keeping
+    every glyph) and parsed; the stripped font and its metrics (widths,
+    cmap, glyph ids, descriptor) are kept in memory and in an on-disk
+    cache, so new processes skip fontTools entirely. Documents get a
+    lightweight copy of the font with their own glyph subset, so only the
+    glyphs a report uses are embedded, and unhinted, on output. The
+    copies are built from fpdf's TTFFont internals; if those change, fonts
+    are added the regular way.
+    """
+    def __init__(self, cache):
+        self.cache = cache
+        self._files = None
+        self._templates = {}
+        self._lock = threading.Lock()
+    
+    def files(self):
+        """{group: {style: path}} for the font groups whose files were all found"""
+        if self._files is None:
+            directories = font_directories() if UNICODE_FONTS else []
+            found = {}
+            for group, styles in UNICODE_FONT_FILES.items():
+                paths = {}
+                for style, name in styles.items():
+                    path = next((os.path.join(d, name) for d in directories
+                                 if os.path.isfile(os.path.join(d, name))), None)
+                    if path is None:
+                        break
+                    paths[style] = path
+                else:
+                    found[group] = paths
+            self._files = found
+        return self._files
+    
+    def resolve(self, pdf, family, style=''):
+        """fpdf family to use for a requested family, installing its TTF font on first use"""
+        group = FONT_GROUPS.get(family.lower())
+        if group is None:
+            return family
+        style = ''.join(sorted(char for char in str(style).upper() if char in 'BI'))
+        path = self.files().get(group, {}).get(style)
+        if path is None:
+            return CORE_FONT_FALLBACK[group]
+        
+        family = f"pdfc-{group}"
+        if f"{family}{style}" not in pdf.fonts:
+            try:
+                pdf.fonts[f"{family}{style}"] = self._document_font(pdf, path, f"{family}{style}", style)
+            except Exception:
+                pdf.add_font(family, style, path)
+        return family
+    
+    def _template(self, path):
+        """(stripped font bytes, metrics) for a font file, built at most once per process"""
+        with self._lock:
+            template = self._templates.get(path)
+            if template is not None:
+                return template
+            
+            from collections import defaultdict
+            
+            with open(path, 'rb') as f:
+                original = f.read()
+            key = self.cache.make_key(original, {'version': FONT_METRICS_VERSION})
+            cached = self.cache.read(key)
+            if cached is not None:
+                entry = json.loads(cached)
+                data, metrics = base64.b64decode(entry['font']), entry['metrics']
+            else:
+                data = self._strip(original)
+                metrics = self._parse(data)
+                entry = {'font': base64.b64encode(data).decode('ascii'), 'metrics': metrics}
+                self.cache.put(key, json.dumps(entry).encode('utf-8'))
+            
+            # Shared, read-only lookups; JSON object keys are strings
+            missing_width = metrics['desc']['missing_width']
+            metrics['cw'] = defaultdict(lambda: missing_width, {int(k): v for k, v in metrics['cw'].items()})
+            metrics['glyph_ids'] = {int(k): v for k, v in metrics['glyph_ids'].items()}
+            metrics['cmap'] = {int(k): v for k, v in metrics['cmap'].items()}
+            template = self._templates[path] = (data, metrics)
+            return template
+    
+    @staticmethod
+    def _strip(data):
+        """The font without hinting or layout tables"""
+        from fontTools import subset, ttLib
+        
+        font = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False)
+        options = subset.Options(notdef_outline=True, recommended_glyphs=True, hinting=False,
+                                 glyph_names=True, layout_features=[], name_IDs=['*'])
+        options.drop_tables += ['GSUB', 'GPOS', 'GDEF', 'kern', 'hdmx', 'FFTM']
+        subsetter = subset.Subsetter(options)
+        subsetter.populate(unicodes=font.getBestCmap())
+        subsetter.subset(font)
+        output = io.BytesIO()
+        font.save(output)
+        return output.getvalue()
+    
+    @staticmethod
+    def _parse(data):
+        """JSON-serialisable metrics of a TTF font, as parsed by fpdf"""
+        from fpdf import FPDF
+        from fpdf.fonts import TTFFont
+        
+        font = TTFFont(FPDF(), io.BytesIO(data), 'template', '')
+        desc = font.desc
+        return {
+            'name': font.name,
+            'scale': font.scale,
+            'up': font.up, 'ut': font.ut, 'sp': font.sp, 'ss': font.ss,
+            'is_cff': font.is_cff,
+            'is_cid_keyed': font.is_cid_keyed,
+            'is_symbol': font.is_symbol,
+            'cff_ros': font.cff_ros,
+            'desc': {
+                'ascent': desc.ascent, 'descent': desc.descent, 'cap_height': desc.cap_height,
+                'flags': desc.flags.value, 'font_b_box': desc.font_b_box,
+                'italic_angle': desc.italic_angle, 'stem_v': desc.stem_v,
+                'missing_width': desc.missing_width,
+            },
+            'cw': dict(font.cw),
+            'glyph_ids': font.glyph_ids,
+            'cmap': font.cmap,
+        }
+    
+    def _document_font(self, pdf, path, fontkey, style):
+        """A per-document TTFFont sharing the process-wide parsed metrics"""
+        from fontTools import ttLib
+        from fpdf.enums import FontDescriptorFlags, TextEmphasis
+        from fpdf.fonts import PDFFontDescriptor, SubsetMap, TTFFont
+        
+        data, metrics = self._template(path)
+        font = TTFFont.__new__(TTFFont)
+        font.i = len(pdf.fonts) + 1
+        font.type = "TTF"
+        font.ttffile = path
+        font.fontkey = fontkey
+        font.emphasis = TextEmphasis.coerce(style)
+        font.is_compressed = False
+        font.collection_font_number = 0
+        font.biggest_size_pt = 0
+        font._hbfont = None
+        font.color_font = None
+        font.palette_index = 0
+        # Subsetting on output modifies the fontTools object: one per document
+        font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, recalcBBoxes=False, lazy=True)
+        for name in ('name', 'scale', 'up', 'ut', 'sp', 'ss', 'is_cff', 'is_cid_keyed', 'is_symbol'):
+            setattr(font, name, metrics[name])
+        font.cff_ros = tuple(metrics['cff_ros']) if metrics['cff_ros'] else None
+        desc = dict(metrics['desc'], flags=FontDescriptorFlags(metrics['desc']['flags']))
+        font.desc = PDFFontDescriptor(**desc)
+        font.cw = metrics['cw']
+        font.glyph_ids = metrics['glyph_ids']
+        font.cmap = metrics['cmap']
+        font.missing_glyphs = []
+        font.subset = SubsetMap(font)
+        return font
+
+font_registry = FontRegistry(ContentCache(os.path.join(CACHE_DIR, 'fonts'), FONT_CACHE_MAX_BYTES, suffix='.json'))
+
+# Typeset formulas (matplotlib mathtext, converted to PDF path operators).
+# Outlines are memoized per (source line, font size) in memory and on disk,
+# so a formula is typeset once and then placed in any report for the cost
+# of copying its operators.
+FORMULA_FONT_SIZE = 14
+FORMULA_FORMAT_VERSION = 1
+FORMULA_MEMORY_ENTRIES = 512
+FORMULA_CACHE_MAX_BYTES = int(os.environ.get('PDFC_FORMULA_CACHE_MB', '32')) * 1024 * 1024
+
+# Formula lines typeset as math: those with $...$ spans, or else a TeX command
+MATH_SPAN = re.compile(r'\$[^$]+\$')
+TEX_COMMAND = re.compile(r'\\[A-Za-z]+')
+
+def formula_math_source(line):
+    """mathtext source for a formula line, or None for prose.
+
+    Lines with $...$ spans are typeset as given (mathtext sets the text
+    around them upright, keeping its spaces), lines with a TeX command as
+    math as a whole. Anything else, like "where k = turbulent kinetic
+    energy", is plain text, which mathtext would set in italics with its
+    spaces dropped.
+    """
+    line = line.strip()
+    if MATH_SPAN.search(line):
+        return line
+    if TEX_COMMAND.search(line):
+        return f"${line}$"
+    return None
+
+def path_operators(path):
+    """PDF path construction operators for a matplotlib Path (units unchanged)"""
+    from matplotlib.path import Path
+    
+    operators = []
+    start = current = (0.0, 0.0)
+    for vertices, code in path.iter_segments(simplify=False, curves=True):
+        if code == Path.MOVETO:
+            start = current = (vertices[0], vertices[1])
+            operators.append(f"{vertices[0]:.2f} {vertices[1]:.2f} m")
+        elif code == Path.LINETO:
+            current = (vertices[0], vertices[1])
+            operators.append(f"{vertices[0]:.2f} {vertices[1]:.2f} l")
+        elif code == Path.CURVE3:
+            # Quadratic TrueType segment as the equivalent cubic Bezier
+            qx, qy, x, y = vertices
+            x1, y1 = current[0] + 2 / 3 * (qx - current[0]), current[1] + 2 / 3 * (qy - current[1])
+            x2, y2 = x + 2 / 3 * (qx - x), y + 2 / 3 * (qy - y)
+            current = (x, y)
+            operators.append(f"{x1:.2f} {y1:.2f} {x2:.2f} {y2:.2f} {x:.2f} {y:.2f} c")
+        elif code == Path.CURVE4:
+            current = (vertices[4], vertices[5])
+            operators.append(" ".join(f"{value:.2f}" for value in vertices) + " c")
+        elif code == Path.CLOSEPOLY:
+            current = start
+            operators.append("h")
+    return "\n".join(operators)
+
+class FormulaCache:
+    """Typeset formula outlines, memoized by source and font size.
+
+    An entry holds the outline as PDF path operators in points, relative to
+    the left end of the baseline (y up), and its extent. Entries are kept in
+    a small in-memory LRU and in an on-disk cache shared by every process;
+    None is returned when matplotlib is not installed or mathtext cannot
+    parse the source, and the caller prints the source instead.
+    """
+    def __init__(self, cache, max_entries=FORMULA_MEMORY_ENTRIES):
+        self.cache = cache
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._disabled = False
+    
+    def get(self, source, size=FORMULA_FONT_SIZE):
+        """Outline entry for a mathtext source, or None if it cannot be typeset"""
+        entry = self._lookup(source, size)
+        return entry if entry and entry['ops'] else None
+    
+    def _lookup(self, source, size):
+        memory_key = (source, size)
+        with self._lock:
+            if memory_key in self._entries:
+                # Re-insert to mark as most recently used
+                entry = self._entries[memory_key] = self._entries.pop(memory_key)
+                return entry
+            if self._disabled:
+                return None
+            
+            key = self.cache.make_key(source.encode('utf-8'), {'version': FORMULA_FORMAT_VERSION, 'size': size})
+            cached = self.cache.read(key)
+            if cached is not None:
+                entry = json.loads(cached)
+            else:
+                entry = self._typeset(source, size)
+                if self._disabled:
+                    return None
+                self.cache.put(key, json.dumps(entry).encode('utf-8'))
+            
+            self._entries[memory_key] = entry
+            if len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            return entry
+    
+    def _typeset(self, source, size):
+        try:
+            from matplotlib.textpath import TextPath
+        except ImportError:
+            self._disabled = True
+            return None
+        try:
+            path = TextPath((0, 0), source, size=size)
+        except ValueError:
+            # mathtext syntax error: cached too, so it is not re-parsed
+            return {'ops': None}
+        if not len(path.vertices):
+            return {'ops': None}
+        extents = path.get_extents()
+        return {
+            'ops': path_operators(path),
+            'x0': extents.x0, 'x1': extents.x1,
+            'ascent': extents.y1, 'descent': -extents.y0,
+        }
+
+formula_cache = FormulaCache(ContentCache(os.path.join(CACHE_DIR, 'formulas'), FORMULA_CACHE_MAX_BYTES, suffix='.json'))
+
+def read_image_bytes(source):
+    """Return the raw bytes of an UploadedFile, file-like object or file path"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return f.read()
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    source.seek(0)
+    return source.read()
+
+def image_dimensions(source):
+    """Read (width, height) from the image header without decoding pixels"""
+    from PIL import Image
+    
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    with Image.open(source) as img:
+        return img.size
+
+# Strip/tiled TIFFs are decoded this many rows (at least) at a time
+DECODE_BAND_ROWS = 256
+
+def load_reduced(img, width, reducing_gap=2.0):
+    """Decode an opened image only as far as resampling it to `width` needs.
+
+    JPEGs are decoded at a reduced DCT scale (draft mode) and uncompressed
+    striped or tiled TIFFs a band of strips at a time, each band reduced
+    as soon as it is read, so memory follows the placed size rather than
+    the source size. Other formats are decoded in full; palette and other
+    modes reduce() cannot average are converted a band at a time, each band
+    reduced as it is converted, so no full-size converted copy is made.
+    The result is still at least reducing_gap times wider than `width`,
+    for the final LANCZOS resize.
+    """
+    factor = img.width // max(1, round(width * reducing_gap))
+    if factor < 2:
+        img.load()
+        return img
+    if img.format == 'JPEG':
+        img.draft(img.mode, (img.width // factor, img.height // factor))
+        img.load()
+        return img
+    if img.format == 'TIFF' and len(img.tile) > 1 and not img.use_load_libtiff:
+        try:
+            return load_tiff_bands(img, factor)
+        except Exception:
+            pass  # Pillow internals differ or the file is damaged: decode it whole
+    img.load()
+    if img.mode in ('L', 'RGB', 'RGBA'):
+        return img.reduce(factor)
+    return convert_reduced(img, factor)
+
+def convert_reduced(img, factor, band_rows=DECODE_BAND_ROWS):
+    """A loaded image converted to L/RGB/RGBA and reduced by an integer
+    factor, converting one band of rows at a time"""
+    from PIL import Image
+    
+    mode = 'RGBA' if has_alpha(img) else 'RGB'
+    width, height = img.size
+    output = Image.new(mode, (-(-width // factor), -(-height // factor)))
+    # Bands a multiple of the factor high reduce exactly like the whole image
+    rows = max(factor, band_rows - band_rows % factor)
+    for top in range(0, height, rows):
+        band = img.crop((0, top, width, min(height, top + rows))).convert(mode)
+        output.paste(band.reduce(factor), (0, top // factor))
+    return output
+
+def has_alpha(img):
+    # Image.has_transparency_data, which needs Pillow 10.1
+    return img.mode in ('LA', 'La', 'PA', 'RGBA', 'RGBa') or 'transparency' in img.info
+
+def load_tiff_bands(img, factor, band_rows=DECODE_BAND_ROWS):
+    """Decode a striped/tiled TIFF band by band, reduced by an integer factor.
+
+    Drives Pillow's decoders directly through private APIs; load_reduced
+    falls back to a full decode if this fails.
+    """
+    from PIL import Image
+    
+    mode = img.mode if img.mode in ('L', 'RGB', 'RGBA') else ('RGBA' if has_alpha(img) else 'RGB')
+    width, height = img.size
+    output = Image.new(mode, (-(-width // factor), -(-height // factor)))
+    
+    def decode_band(tiles, top, bottom):
+        band = Image.core.new(img.mode, (width, bottom - top))
+        for name, (x0, y0, x1, y1), offset, args in tiles:
+            decoder = Image._getdecoder(img.mode, name, args, img.decoderconfig)
+            decoder.setimage(band, (x0, y0 - top, x1, y1 - top))
+            img.fp.seek(offset)
+            data = b''
+            try:
+                while True:
+                    chunk = img.fp.read(img.decodermaxblock)
+                    if not chunk:
+                        raise OSError("image file is truncated")
+                    data += chunk
+                    consumed, error = decoder.decode(data)
+                    if consumed < 0:
+                        break
+                    data = data[consumed:]
+            finally:
+                decoder.cleanup()
+            if error < 0:
+                raise OSError(f"decoder error {error} when reading image file")
+        band = img._new(band)
+        if band.mode != mode:
+            band = band.convert(mode)
+        output.paste(band.reduce(factor), (0, top // factor))
+    
+    # Bands end on a strip boundary with a height that divides by the factor.
+    # Tiles are (decoder, extents, offset, args); plain tuples before Pillow 11
+    band, top, bottom = [], 0, 0
+    for tile in sorted(img.tile, key=lambda tile: (tile[1][1], tile[1][0], tile[2])):
+        _, (_, y0, _, y1), _, _ = tile
+        if y0 >= bottom and bottom - top >= band_rows and (bottom - top) % factor == 0:
+            decode_band(band, top, bottom)
+            band, top = [], bottom
+        band.append(tile)
+        bottom = max(bottom, y1)
+    if band:
+        decode_band(band, top, bottom)
+    return output
+
+def encode_image(data, max_width=None):
+    """Downsample image bytes or an image file to max_width pixels and encode them for embedding.
+
+    Returns (bytes, codec). The codec is chosen from the content:
+    'passthrough' keeps JPEGs and palette/greyscale PNGs that need no
+    downsampling as they are, 'png-palette' stores images with few colours
+    losslessly, 'png-quantized' reduces anti-aliased plots to a palette,
+    and 'jpeg' is used for continuous-tone renders.
+    """
+    from PIL import Image
+    
+    with Image.open(io.BytesIO(data) if isinstance(data, bytes) else data) as img:
+        # Never upsample: only shrink images wider than the placed size needs
+        resize = max_width and img.width > max_width
+        if not resize and (img.format == 'JPEG' and img.mode in ('RGB', 'L')
+                           or img.format == 'PNG' and img.mode in ('P', 'L') and 'transparency' not in img.info):
+            return (data if isinstance(data, bytes) else read_image_bytes(data)), 'passthrough'
+        
+        if resize:
+            height = max(1, round(img.height * max_width / img.width))
+            img = load_reduced(img, max_width)
+        else:
+            img.load()
+        if img.mode != 'RGB':
             img = img.convert('RGB')
-        img.save(img_path, 'JPEG', quality=85)
+        if resize:
+            img = img.resize((max_width, height), Image.LANCZOS, reducing_gap=3.0)
+    
+    colors = img.getcolors(maxcolors=IMAGE_ENCODING['plot_colors'])
+    output = io.BytesIO()
+    if colors is None:
+        img.save(output, 'JPEG', quality=IMAGE_ENCODING['jpeg_quality'], optimize=True)
+        codec = 'jpeg'
+    else:
+        # Median cut keeps up to 256 colours exactly; the octree is much faster on more
+        exact = len(colors) <= IMAGE_ENCODING['palette_colors']
+        method = Image.Quantize.MEDIANCUT if exact else Image.Quantize.FASTOCTREE
+        palette = img.quantize(IMAGE_ENCODING['palette_colors'], method=method, dither=Image.Dither.NONE)
+        palette.save(output, 'PNG', compress_level=IMAGE_ENCODING['png_level'])
+        codec = 'png-palette' if exact else 'png-quantized'
+    return output.getvalue(), codec
+
+def image_cache_key(source, max_width=None):
+    """Image cache key of a source's encoding at max_width: (key, data, source size).
+
+    Keyed by the sha256 of the source's contents: uploads reuse the digest
+    the blob store computed when they arrived, other files are hashed in
+    chunks. data is the source's bytes, or the path itself for file paths,
+    which are decoded from the file, so a huge source is never held in
+    memory.
+    """
+    params = dict(IMAGE_ENCODING, max_width=max_width)
+    if isinstance(source, UploadHandle):
+        digest, data, size = source.digest, source, source.size
+    elif isinstance(source, (str, os.PathLike)):
+        digest, data, size = ContentCache.file_digest(source), source, os.path.getsize(source)
+    else:
+        data = read_image_bytes(source)
+        digest, size = hashlib.sha256(data).hexdigest(), len(data)
+    return ContentCache.make_key(digest.encode('ascii'), params), data, size
+
+def prepare_image(source, max_width=None):
+    """Encode an image source for embedding, going through the image cache.
+
+    Images wider than max_width pixels are resampled down to it.
+    Encodings are served from the on-disk image cache when the same bytes
+    were encoded before. Nothing is written to a temp directory; the bytes
+    are handed to fpdf directly. Returns (bytes, info) where info holds
+    the codec, source and output sizes, encode time and whether it was a
+    cache hit (the codec is then only known as 'jpeg' or 'png'). Raises on
+    unreadable images.
+    """
+    start = time.perf_counter()
+    key, data, source_bytes = image_cache_key(source, max_width)
+    encoded = image_cache.read(key)
+    if encoded is not None:
+        codec, cached = ('jpeg' if encoded[:2] == b'\xff\xd8' else 'png'), True
+    else:
+        encoded, codec = encode_image(data, max_width)
+        cached = False
+        try:
+            image_cache.put(key, encoded)
+        except OSError:
+            pass  # Read-only cache directory: just skip caching
+    info = {'codec': codec, 'cached': cached, 'source_bytes': source_bytes, 'output_bytes': len(encoded),
+            'encode_s': time.perf_counter() - start}
+    return encoded, info
+
+class ImagePlaceholder:
+    """Stand-in for an encoded image in dry runs: its pixel size, nothing to draw"""
+    __slots__ = ('width', 'height')
+    
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+def plan_image(source, max_width=None):
+    """Dry-run counterpart of prepare_image: (ImagePlaceholder, info), no pixels decoded.
+
+    The size comes from the image header, or from the dimensions an
+    UploadHandle recorded at upload. info['output_bytes'] is exact when the
+    image cache already holds the encoding ('cached'), otherwise the source
+    size scaled by the pixel-count ratio (like estimate_image_downsampling),
+    capped at ESTIMATED_BYTES_PER_PIXEL.
+    """
+    start = time.perf_counter()
+    width, height = getattr(source, 'width', None), getattr(source, 'height', None)
+    if not (width and height):
+        width, height = image_dimensions(source)
+    key, _, source_bytes = image_cache_key(source, max_width)
+    
+    scale = min(1.0, max_width / width) if max_width else 1.0
+    if scale < 1.0:
+        # encode_image's output size, so pages break where the real build's do
+        width, height = max_width, max(1, round(height * max_width / width))
+    cached_path = image_cache.get(key)
+    if cached_path is not None:
+        try:
+            with open(cached_path, 'rb') as f:
+                codec = 'jpeg' if f.read(2) == b'\xff\xd8' else 'png'
+                output_bytes = os.fstat(f.fileno()).st_size
+        except OSError:
+            cached_path = None  # evicted since get(): estimate from the source
+    if cached_path is None:
+        codec = 'estimate'
+        output_bytes = round(min(source_bytes * scale * scale, width * height * ESTIMATED_BYTES_PER_PIXEL))
+    info = {'codec': codec, 'cached': cached_path is not None, 'source_bytes': source_bytes,
+            'output_bytes': output_bytes, 'encode_s': time.perf_counter() - start}
+    return ImagePlaceholder(width, height), info
+
+# Previews in the image lists: THUMBNAIL_WIDTH pixels wide (twice the
+# displayed width, for high-DPI screens), WebP when Pillow supports it
+THUMBNAIL_WIDTH = 300
+
+def thumbnail_format():
+    from PIL import features
+    
+    return ('WEBP', 80) if features.check('webp') else ('JPEG', 80)
+
+def image_thumbnail(source, width=THUMBNAIL_WIDTH):
+    """Small preview of an image, cached by the source's content fingerprint.
+
+    Built once per image (normally when it is uploaded); later calls only
+    read the cached preview, without touching the full-size source.
+    """
+    image_format, quality = thumbnail_format()
+    key = ContentCache.make_key(source_fingerprint(source).encode('utf-8'),
+                                {'width': width, 'format': image_format, 'quality': quality})
+    data = thumbnail_cache.read(key)
+    if data is not None:
+        return data
+    
+    from PIL import Image
+    
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    with Image.open(source) as img:
+        # Decodes JPEGs and striped TIFFs at a reduced scale when that is enough
+        scale = min(width / img.width, width * 4 / img.height)
+        img = load_reduced(img, round(img.width * scale))
+        img.thumbnail((width, width * 4), Image.LANCZOS, reducing_gap=2.0)
+        keep_alpha = image_format == 'WEBP' and (img.mode in ('RGBA', 'LA') or 'transparency' in img.info)
+        mode = 'RGBA' if keep_alpha else 'RGB'
+        if img.mode != mode:
+            img = img.convert(mode)
+        output = io.BytesIO()
+        img.save(output, image_format, quality=quality)
+    data = output.getvalue()
+    try:
+        thumbnail_cache.put(key, data)
+    except OSError:
+        pass  # Read-only cache directory: just skip caching
+    return data
+
+# Worker threads for the image preprocessing stage (0 = executor default)
+IMAGE_WORKERS = int(os.environ.get('PDFC_IMAGE_WORKERS', '0')) or None
+
+def preprocess_report_images(report_data, figure_max_width=None, logo_max_width=None, workers=None,
+                             keys=('company_logo', 'result_images', 'convergence_images'), profiler=None, spill=None,
+                             dry_run=False):
+    """Decode, resize and encode every report image concurrently.
+
+    Pillow releases the GIL while decoding, resampling and encoding, so a
+    thread pool scales with cores. Returns a dict with the logo bytes,
+    per-image bytes for result_images and convergence_images (in report
+    order, None where an image is missing or failed), a list of error
+    messages for the failed ones and the prepare_image info of each
+    encoded image (under 'encodings', with its caption as 'image'). Image
+    lists not named in keys are left unprocessed (returned empty). With a
+    SpillFile the images are parked in it and SpilledData handles are
+    returned instead of bytes; a dry run returns ImagePlaceholders from
+    plan_image.
+    """
+    jobs = []
+    if 'company_logo' in keys:
+        jobs.append(('company_logo', 'Company logo', report_data['company_logo'], logo_max_width))
+    for key in ('result_images', 'convergence_images'):
+        if key not in keys:
+            continue
+        for img_data in report_data[key]:
+            jobs.append((key, img_data['caption'], img_data['file'], figure_max_width))
+    
+    def run(job):
+        _, caption, source, max_width = job
+        if not source:
+            return None, None, None
+        try:
+            with profile_step(profiler, f"Prepare image: {caption}", kind='image', memory=False):
+                data, info = (plan_image if dry_run else prepare_image)(source, max_width)
+            if spill is not None:
+                data = spill.park(data)
+            return data, dict(info, image=caption), None
+        except Exception as e:
+            return None, None, f"{caption or 'Image'}: {e}"
+    
+    pending = sum(1 for job in jobs if job[2])
+    if pending > 1 and (workers or IMAGE_WORKERS) != 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers or IMAGE_WORKERS) as pool:
+            outcomes = list(pool.map(run, jobs))
+    else:
+        outcomes = [run(job) for job in jobs]
+    
+    prepared = {'company_logo': None, 'result_images': [], 'convergence_images': [], 'errors': [], 'encodings': []}
+    for (key, _, _, _), (data, info, error) in zip(jobs, outcomes):
+        if error:
+            prepared['errors'].append(error)
+        if info:
+            prepared['encodings'].append(info)
+        if key == 'company_logo':
+            prepared[key] = data
+        else:
+            prepared[key].append(data)
+    return prepared
+
+def estimate_image_downsampling(report_data):
+    """Estimate embedded image size at the report's target DPI.
+
+    Uploads use the size and dimensions recorded at upload; other sources
+    only have their headers read. The downsampled size is the source size
+    scaled by the pixel-count ratio, which is a rough but cheap proxy for
+    the JPEG payload.
+    """
+    dpi = report_data.get('image_dpi')
+    placements = [(report_data['company_logo'], ProfessionalPDFLayout.LOGO_WIDTH)]
+    for img_data in report_data['result_images'] + report_data['convergence_images']:
+        placements.append((img_data['file'], ProfessionalPDFLayout.FIGURE_WIDTH))
+    
+    estimate = {'images': 0, 'source_pixels': 0, 'target_pixels': 0, 'source_bytes': 0, 'estimated_bytes': 0}
+    for source, width_mm in placements:
+        if not source:
+            continue
+        try:
+            if isinstance(source, UploadHandle) and source.width and source.height:
+                width, height, size = source.width, source.height, source.size
+            else:
+                width, height = image_dimensions(source)
+                size = os.path.getsize(source) if isinstance(source, (str, os.PathLike)) else len(read_image_bytes(source))
+        except Exception:
+            continue
+        max_width = target_pixel_width(width_mm, dpi)
+        scale = min(1.0, max_width / width) if max_width else 1.0
+        estimate['images'] += 1
+        estimate['source_pixels'] += width * height
+        estimate['target_pixels'] += width * height * scale * scale
+        estimate['source_bytes'] += size
+        estimate['estimated_bytes'] += size * scale * scale
+    return estimate
+
+# Uploaded files are kept once on disk, keyed by content hash; session state
+# only holds UploadHandle references. Each session may reference at most
+# UPLOAD_SESSION_QUOTA_BYTES. Blobs no live session referenced within
+# UPLOAD_ORPHAN_GRACE seconds are deleted; sessions not seen for
+# UPLOAD_SESSION_TTL seconds no longer count as live.
+UPLOAD_DIR = os.path.join(CACHE_DIR, 'uploads')
+UPLOAD_SESSION_QUOTA_BYTES = int(os.environ.get('PDFC_UPLOAD_QUOTA_MB', '1024')) * 1024 * 1024
+UPLOAD_SESSION_TTL = int(os.environ.get('PDFC_UPLOAD_SESSION_TTL', str(24 * 3600)))
+UPLOAD_ORPHAN_GRACE = 3600
+UPLOAD_SWEEP_INTERVAL = 600
+
+class UploadHandle:
+    """Reference to an uploaded file in the blob store.
+
+    Path-like, so it can be passed wherever an image or log path is
+    accepted; fingerprint() is the content hash.
+    """
+    def __init__(self, digest, path, name, size, width=None, height=None):
+        self.digest = digest
+        self.path = path
+        self.name = name
+        self.size = size
+        self.width = width
+        self.height = height
+    
+    def __fspath__(self):
+        return self.path
+    
+    def fingerprint(self):
+        return self.digest
+    
+    def __reduce__(self):
+        # Pickled (and deep-copied) as the class of the importable module, see worker_module
+        return worker_module().UploadHandle, (self.digest, self.path, self.name, self.size, self.width, self.height)
+
+class BlobStore:
+    """Content-addressed on-disk store for uploads, with per-session quotas.
+
+    Sessions report the handles they hold on every rerun (track); blobs
+    referenced by no live session are removed by a periodic sweep once
+    their mtime, refreshed while referenced, is older than the grace
+    period, so several server processes can share the directory.
+    """
+    def __init__(self, directory, session_quota, session_ttl=UPLOAD_SESSION_TTL, grace=UPLOAD_ORPHAN_GRACE):
+        self.directory = directory
+        self.session_quota = session_quota
+        self.session_ttl = session_ttl
+        self.grace = grace
+        # session id -> (last seen, {digest: size})
+        self._sessions = {}
+        self._last_sweep = 0
+        self._lock = threading.Lock()
+    
+    def path_for(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+    
+    def put(self, session_id, source):
+        """Store an uploaded file for a session and return its handle.
+
+        Raises ValueError when the session would exceed its quota.
+        """
+        data = read_image_bytes(source)
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            _, referenced = self._sessions.get(session_id, (0, {}))
+            if digest not in referenced and sum(referenced.values()) + len(data) > self.session_quota:
+                raise ValueError(f"upload quota of {self.session_quota / 1024 ** 2:.0f} MB per session exceeded")
+            self._sessions[session_id] = (time.time(), {**referenced, digest: len(data)})
         
-        return img_path
-    except Exception as e:
-        st.error(f"Error saving image: {str(e)}")
-        return None
+        path = self.path_for(digest)
+        try:
+            os.utime(path)
+        except OSError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so concurrent readers never see a partial file
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        del data
+        
+        try:
+            width, height = image_dimensions(path)
+        except Exception:
+            width = height = None
+        return UploadHandle(digest, path, getattr(source, 'name', digest[:12]), os.path.getsize(path), width, height)
+    
+    def session_bytes(self, session_id):
+        with self._lock:
+            return sum(self._sessions.get(session_id, (0, {}))[1].values())
+    
+    def track(self, session_id, handles):
+        """Record the handles a session holds; sweeps orphans every UPLOAD_SWEEP_INTERVAL"""
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = (now, {handle.digest: handle.size for handle in handles})
+            for stale in [key for key, (seen, _) in self._sessions.items() if now - seen > self.session_ttl]:
+                del self._sessions[stale]
+            if now - self._last_sweep < UPLOAD_SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+            referenced = set().union(*(digests for _, digests in self._sessions.values()))
+        self.sweep(referenced, now)
+    
+    def sweep(self, referenced, now=None):
+        """Refresh referenced blobs and delete orphans older than the grace period"""
+        now = now or time.time()
+        for digest in referenced:
+            try:
+                os.utime(self.path_for(digest))
+            except OSError:
+                pass
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name in referenced:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    if now - os.stat(path).st_mtime > self.grace:
+                        os.remove(path)
+                except OSError:
+                    pass
 
-def create_professional_pdf(report_data, temp_dir):
-    """Generate professional PDF report"""
-    pdf = ProfessionalPDFGenerator()
+blob_store = BlobStore(UPLOAD_DIR, UPLOAD_SESSION_QUOTA_BYTES)
+
+# Solver residual logs are read in LOG_CHUNK_BYTES slices and reduced to at
+# most RESIDUAL_PLOT_POINTS points per series, so huge logs parse in bounded memory
+LOG_CHUNK_BYTES = 8 * 1024 * 1024
+RESIDUAL_PLOT_POINTS = 500
+RESIDUAL_CHUNK_POINTS = 1 << 18
+RESIDUAL_LOG_FORMAT_VERSION = 1
+
+# OpenFOAM: "Time = 42" lines and "...: Solving for Ux, Initial residual = 0.01, ..."
+# (a literal newline instead of ^ keeps the scan fast)
+OPENFOAM_RESIDUAL_RE = re.compile(rb'(?:\nTime = |Solving for (\w+), Initial residual = )([-+.\deE]+)')
+# Fluent transcript: "  iter  continuity  x-velocity ... time/iter" headers and numeric rows
+FLUENT_HEADER_RE = re.compile(rb'^[ \t]*iter[ \t]+([^\r\n]+)', re.M)
+FLUENT_ROW_RE = re.compile(rb'^[ \t]*(\d+[ \t]+[-+.\d][^\r\n]*)', re.M)
+
+def lttb_indices(x, y, points):
+    """Largest-Triangle-Three-Buckets: indices of `points` shape-preserving samples"""
+    import numpy as np
     
-    # Set company logo if available
-    if report_data['company_logo']:
-        pdf.company_logo = save_uploaded_image(report_data['company_logo'], temp_dir)
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
     
-    # Title page
-    pdf.add_title_page(report_data)
+    # Bucket edges for the n - 2 interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    # Average of each following bucket (the last bucket looks ahead to the final point)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    next_x = np.append((sums_x / counts)[1:], x[-1])
+    next_y = np.append((sums_y / counts)[1:], y[-1])
+    
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        bx, by = x[start:stop], y[start:stop]
+        # Twice the triangle area spanned with the previous pick and next bucket's mean
+        area = np.abs((x[previous] - next_x[bucket]) * (by - y[previous])
+                      - (x[previous] - bx) * (next_y[bucket] - y[previous]))
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+class SeriesDownsampler:
+    """Streaming LTTB for one series.
+
+    Points are buffered and every RESIDUAL_CHUNK_POINTS are reduced to
+    `points` samples, so memory stays bounded however long the series is;
+    result() reduces the kept samples once more. With log_y the reduction
+    runs on log10(y), matching a logarithmic plot.
+    """
+    def __init__(self, points=RESIDUAL_PLOT_POINTS, chunk_points=RESIDUAL_CHUNK_POINTS, log_y=True):
+        self.points = points
+        self.chunk_points = chunk_points
+        self.log_y = log_y
+        self.count = 0
+        self._buffered = []
+        self._buffered_points = 0
+        self._kept = []
+    
+    def extend(self, x, y):
+        """Add the points of two numpy arrays"""
+        if self.log_y:
+            # Zero/negative residuals cannot be drawn on a log axis
+            positive = y > 0
+            x, y = x[positive], y[positive]
+        if not len(x):
+            return
+        self._buffered.append((x, y))
+        self._buffered_points += len(x)
+        self.count += len(x)
+        if self._buffered_points >= self.chunk_points:
+            self._flush()
+    
+    def _reduce(self, x, y):
+        import numpy as np
+        
+        shape_y = np.log10(y) if self.log_y else y
+        keep = lttb_indices(x, shape_y, self.points)
+        return x[keep], y[keep]
+    
+    def _flush(self):
+        import numpy as np
+        
+        if self._buffered:
+            x = np.concatenate([bx for bx, _ in self._buffered])
+            y = np.concatenate([by for _, by in self._buffered])
+            self._kept.append(self._reduce(x, y))
+            self._buffered, self._buffered_points = [], 0
+    
+    def result(self):
+        """Downsampled ([x...], [y...]) lists"""
+        import numpy as np
+        
+        self._flush()
+        if not self._kept:
+            return [], []
+        x, y = self._reduce(np.concatenate([kx for kx, _ in self._kept]),
+                            np.concatenate([ky for _, ky in self._kept]))
+        return x.tolist(), y.tolist()
+
+@contextlib.contextmanager
+def open_log_buffer(source):
+    """Yield a read-only buffer over a log: an mmap for paths, the bytes for uploads"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if hasattr(buffer, 'madvise'):
+                    buffer.madvise(mmap.MADV_SEQUENTIAL)
+                yield buffer
+    else:
+        yield read_image_bytes(source)
+
+def iter_log_chunks(buffer, boundary=b'\n'):
+    """Yield consecutive slices of a log buffer, each cut just before `boundary`.
+
+    Pages of an mmap are dropped from the resident set once parsed, so
+    memory use does not grow with the size of the log.
+    """
+    start, size, released = 0, len(buffer), 0
+    while start < size:
+        end = start + LOG_CHUNK_BYTES
+        if end >= size:
+            end = size
+        else:
+            cut = buffer.rfind(boundary, start, end)
+            if cut < start:
+                # No boundary inside a whole chunk: read on to the next one
+                cut = buffer.find(boundary, end)
+            end = size if cut < 0 else cut + 1
+        yield buffer[start:end]
+        start = end
+        
+        if isinstance(buffer, mmap.mmap) and hasattr(mmap, 'MADV_DONTNEED'):
+            page_end = start - start % mmap.PAGESIZE
+            if page_end > released:
+                buffer.madvise(mmap.MADV_DONTNEED, released, page_end - released)
+                released = page_end
+
+def parse_openfoam_residuals(buffer, points):
+    """Initial residual of each solved field per time step ({field: downsampler})"""
+    import numpy as np
+    
+    series = {}
+    for chunk in iter_log_chunks(buffer, boundary=b'\nTime = '):
+        rows = OPENFOAM_RESIDUAL_RE.findall(b'\n' + chunk)
+        if not rows:
+            continue
+        # (field, value) rows; "Time =" rows have no field
+        table = np.array(rows)
+        is_time = table[:, 0] == b''
+        step = np.cumsum(is_time) - 1
+        # Residuals logged before the first "Time =" of a chunk have no time step
+        solved = ~is_time & (step >= 0)
+        if not solved.any():
+            continue
+        times = table[is_time, 1].astype(float)
+        steps = step[solved]
+        values = table[solved, 1].astype(float)
+        names, field_ids = np.unique(table[solved, 0], return_inverse=True)
+        # Only the first solve of a field per time step (later ones are correctors)
+        _, first = np.unique(steps * len(names) + field_ids, return_index=True)
+        for i, name in enumerate(names):
+            keep = first[field_ids[first] == i]
+            field = name.decode('utf-8', 'replace')
+            if field not in series:
+                series[field] = SeriesDownsampler(points)
+            series[field].extend(times[steps[keep]], values[keep])
+    return "Time / Iteration", series
+
+def parse_numeric_rows(rows, columns, delimiter=None):
+    """First `columns` columns of numeric text rows as a float array; bad rows are skipped"""
+    import numpy as np
     
-    # Table of Contents
-    pdf.add_page()
+    # Fast path: numpy's C parser, which fails on rows that are not all alike
+    try:
+        return np.loadtxt(rows, usecols=range(columns), delimiter=delimiter, ndmin=2)
+    except ValueError:
+        pass
+    
+    parsed = []
+    for row in rows:
+        values = row.split(delimiter.encode('ascii') if delimiter else None)[:columns]
+        if len(values) < columns:
+            continue
+        try:
+            parsed.append([float(value) for value in values])
+        except ValueError:
+            continue
+    return np.array(parsed, dtype=float).reshape(-1, columns)
+
+def parse_fluent_residuals(buffer, points):
+    """Residual columns of a Fluent transcript ({column: downsampler})"""
+    names, series = None, {}
+    
+    def add_rows(chunk, start, end):
+        if names is None:
+            return
+        rows = FLUENT_ROW_RE.findall(chunk, start, end)
+        if not rows:
+            return
+        table = parse_numeric_rows(rows, len(names) + 1)
+        for i, name in enumerate(names):
+            if name not in series:
+                series[name] = SeriesDownsampler(points)
+            series[name].extend(table[:, 0], table[:, i + 1])
+    
+    for chunk in iter_log_chunks(buffer):
+        start = 0
+        for header in FLUENT_HEADER_RE.finditer(chunk):
+            # The trailing time/iter column holds no residual
+            header_names = [name.decode('utf-8', 'replace') for name in header.group(1).split()
+                            if name != b'time/iter']
+            if header_names != names:
+                add_rows(chunk, start, header.start())
+                names, start = header_names, header.end()
+        add_rows(chunk, start, len(chunk))
+    return "Iteration", series
+
+def parse_residual_log(source, points=RESIDUAL_PLOT_POINTS):
+    """Parse a Fluent transcript or OpenFOAM solver log into downsampled residual series.
+
+    Returns {'x_label': ..., 'series': {name: [[x...], [y...]]}, 'samples': n}
+    where samples is the number of parsed residual values.
+    """
+    with open_log_buffer(source) as buffer:
+        if b'Solving for ' in buffer[:1024 * 1024]:
+            x_label, series = parse_openfoam_residuals(buffer, points)
+        else:
+            x_label, series = parse_fluent_residuals(buffer, points)
+    
+    if not series:
+        raise ValueError("no residuals found (expected a Fluent transcript or OpenFOAM solver log)")
+    return {
+        'x_label': x_label,
+        'series': {name: list(downsampler.result()) for name, downsampler in series.items()},
+        'samples': sum(downsampler.count for downsampler in series.values()),
+    }
+
+def load_residual_plot(source, points=RESIDUAL_PLOT_POINTS):
+    """parse_residual_log through the on-disk cache, keyed by the log's fingerprint"""
+    key = residual_cache.make_key(
+        source_fingerprint(source).encode('utf-8'),
+        {'points': points, 'version': RESIDUAL_LOG_FORMAT_VERSION}
+    )
+    cached = residual_cache.read(key)
+    if cached is not None:
+        return json.loads(cached)
+    plot = parse_residual_log(source, points)
+    residual_cache.put(key, json.dumps(plot).encode('utf-8'))
+    return plot
+
+# Force/monitor files (OpenFOAM postProcessing .dat, Fluent report files, CSV):
+# statistics cover the last MONITOR_WINDOW rows unless a window is given
+MONITOR_WINDOW = 1000
+MONITOR_ROW_RE = re.compile(rb'^[ \t]*[-+]?\.?\d[^\r\n]*', re.M)
+
+def monitor_header(buffer):
+    """(column names, delimiter) from the lines above the first data row"""
+    head = bytes(buffer[:64 * 1024])
+    first_row = MONITOR_ROW_RE.search(head)
+    if first_row is None:
+        raise ValueError("no numeric rows found")
+    row = first_row.group(0).translate(None, b'()')
+    delimiter = ',' if b',' in row else None
+    columns = len(row.split(delimiter.encode('ascii') if delimiter else None))
+    
+    names = []
+    header_lines = [line.strip() for line in head[:first_row.start()].splitlines() if line.strip()]
+    if header_lines:
+        line = header_lines[-1].decode('utf-8', 'replace')
+        if '"' in line:
+            # Fluent report file: "Iteration" "cd-1" "flow-time"
+            names = re.findall(r'"([^"]*)"', line)
+        else:
+            names = line.lstrip('#').split(delimiter)
+        names = [name.strip() for name in names if name.strip()]
+    if len(names) != columns:
+        # e.g. "# Time forces(pressure viscous)" above expanded vectors: keep the axis name only
+        names = (names[:1] or ["Time"]) + [f"Column {i + 1}" for i in range(1, columns)]
+    return names, delimiter
+
+def monitor_statistics(source, window=MONITOR_WINDOW):
+    """Windowed statistics of every column of a force/monitor file.
+
+    The file is streamed in chunks and only the last `window` rows are
+    kept, so files larger than memory are fine. The first column is taken
+    as the time/iteration axis. Returns {'x_label', 'rows', 'window',
+    'x_range', 'columns': {name: {'mean', 'std', 'min', 'max', 'drift'}}} where drift
+    is the change of the least-squares trend across the window in percent
+    of the mean.
+    """
+    import numpy as np
+    
+    rows = 0
+    tail = None
+    with open_log_buffer(source) as buffer:
+        names, delimiter = monitor_header(buffer)
+        for chunk in iter_log_chunks(buffer):
+            # Vector outputs such as "(1 2 3)" become plain columns
+            lines = MONITOR_ROW_RE.findall(chunk.translate(None, b'()'))
+            if not lines:
+                continue
+            table = parse_numeric_rows(lines, len(names), delimiter)
+            rows += len(table)
+            tail = table[-window:] if tail is None else np.concatenate([tail, table])[-window:]
+    
+    if tail is None or not len(tail):
+        raise ValueError("no numeric rows found")
+    values = tail[:, 1:]
+    mean = values.mean(axis=0)
+    # Least-squares slope of every column against the row index
+    index = np.arange(len(values)) - (len(values) - 1) / 2
+    denominator = (index ** 2).sum() or 1
+    slope = index @ (values - mean) / denominator
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drift = np.where(mean != 0, slope * (len(values) - 1) / np.abs(mean) * 100, np.nan)
+    
+    stats = {
+        name: {
+            'mean': float(mean[i]),
+            'std': float(values[:, i].std()),
+            'min': float(values[:, i].min()),
+            'max': float(values[:, i].max()),
+            'drift': float(drift[i]),
+        }
+        for i, name in enumerate(names[1:])
+    }
+    return {
+        'x_label': names[0],
+        'rows': rows,
+        'window': len(tail),
+        'x_range': (float(tail[0, 0]), float(tail[-1, 0])),
+        'columns': stats,
+    }
+
+def monitor_statistics_rows(statistics):
+    """solution_parameters rows (Parameter, Value, Description) for monitor_statistics()"""
+    first, last = statistics['x_range']
+    window = (f"Mean of last {statistics['window']} of {statistics['rows']} samples "
+              f"({statistics['x_label']} {first:.10g}-{last:.10g})")
+    rows = []
+    for name, stats in statistics['columns'].items():
+        drift = "n/a" if math.isnan(stats['drift']) else f"{stats['drift']:+.2f}%"
+        rows.append([
+            name,
+            f"{stats['mean']:.6g}",
+            f"{window}; std {stats['std']:.3g}, min {stats['min']:.6g}, "
+            f"max {stats['max']:.6g}, drift {drift}"
+        ])
+    return rows
+
+# Column headers of the report tables
+TABLE_COLUMNS = {
+    'mesh_quality_data': ["Parameter", "Value", "Acceptable Range", "Status"],
+    'boundary_conditions_table': ["Boundary", "Type", "Value/Condition", "Description"],
+    'solution_parameters': ["Parameter", "Value", "Description"],
+}
+
+class CSVRows:
+    """Re-iterable rows of a CSV file, read lazily on every pass.
+
+    Lets report specs point a table at a large CSV export without loading
+    it into memory; add_table streams it row by row. A first row matching
+    the table's column names is skipped.
+    """
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.columns = columns
+    
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+            yield from iter_csv_rows(f, self.columns)
+    
+    def __bool__(self):
+        return next(iter(self), None) is not None
+    
+    def fingerprint(self):
+        return source_fingerprint(self.path)
+
+def iter_csv_rows(text_file, columns=None):
+    """Yield CSV rows from a text file, skipping blank lines and a header row"""
+    wanted = [column.strip().lower() for column in columns] if columns else None
+    for i, row in enumerate(csv.reader(text_file)):
+        if not any(cell.strip() for cell in row):
+            continue
+        if i == 0 and wanted and [cell.strip().lower() for cell in row[:len(wanted)]] == wanted:
+            continue
+        yield row
+
+def read_uploaded_csv(uploaded_file, columns):
+    """Parse an uploaded CSV into table rows padded/truncated to the columns"""
+    uploaded_file.seek(0)
+    text_file = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        return [
+            (row + [''] * len(columns))[:len(columns)]
+            for row in iter_csv_rows(text_file, columns)
+        ]
+    finally:
+        text_file.detach()
+
+def render_title_section(pdf, report_data, images):
+    pdf.add_title_page(report_data)
+
+def render_contents_section(pdf, report_data, images):
+    pdf.start_new_page()
     pdf.add_section_header("TABLE OF CONTENTS")
     toc_items = [
         "1. Executive Summary",
@@ -304,131 +2485,1053 @@ def create_professional_pdf(report_data, temp_dir):
     pdf.set_font('Arial', '', 11)
     for item in toc_items:
         pdf.cell(0, 8, item, 0, 1)
-    
-    # Executive Summary
-    pdf.add_page()
+
+def render_executive_summary_section(pdf, report_data, images):
+    pdf.start_new_page()
     pdf.add_section_header("1. EXECUTIVE SUMMARY")
     pdf.add_section_content(report_data['executive_summary'])
-    
-    # Problem Definition
+
+def render_problem_definition_section(pdf, report_data, images):
     pdf.add_section_header("2. PROBLEM DEFINITION & OBJECTIVES")
     pdf.add_section_content(report_data['problem_definition'])
-    
-    # Geometry
+
+def render_geometry_section(pdf, report_data, images):
     pdf.add_section_header("3. GEOMETRY & DOMAIN")
     pdf.add_section_content(report_data['geometry_description'])
-    
-    # Mesh Quality
+
+def render_mesh_section(pdf, report_data, images):
     pdf.add_section_header("4. MESH GENERATION & QUALITY")
     pdf.add_section_content(report_data['mesh_details'])
     
     # Add mesh quality table if provided
     if report_data['mesh_quality_data']:
         pdf.add_section_header("Mesh Quality Metrics", level=2)
-        headers = ["Parameter", "Value", "Acceptable Range", "Status"]
-        pdf.add_table(headers, report_data['mesh_quality_data'])
-    
-    # Boundary Conditions
+        pdf.add_table(TABLE_COLUMNS['mesh_quality_data'], report_data['mesh_quality_data'])
+
+def render_boundary_conditions_section(pdf, report_data, images):
     pdf.add_section_header("5. BOUNDARY CONDITIONS")
     pdf.add_section_content(report_data['boundary_conditions'])
     
     # Add boundary conditions table
     if report_data['boundary_conditions_table']:
-        headers = ["Boundary", "Type", "Value/Condition", "Description"]
-        pdf.add_table(headers, report_data['boundary_conditions_table'])
-    
-    # Methodology
+        pdf.add_table(TABLE_COLUMNS['boundary_conditions_table'], report_data['boundary_conditions_table'])
+
+def render_methodology_section(pdf, report_data, images):
     pdf.add_section_header("6. METHODOLOGY & SOLUTION SETUP")
     pdf.add_section_content(report_data['methodology'])
     
     # Solution parameters table
     if report_data['solution_parameters']:
         pdf.add_section_header("Solution Parameters", level=2)
-        headers = ["Parameter", "Value", "Description"]
-        pdf.add_table(headers, report_data['solution_parameters'])
-    
-    # Results
+        pdf.add_table(TABLE_COLUMNS['solution_parameters'], report_data['solution_parameters'])
+
+def render_results_section(pdf, report_data, images):
     pdf.add_section_header("7. RESULTS & DISCUSSION")
     pdf.add_section_content(report_data['results'])
     
     # Add result images
-    for img_data in report_data['result_images']:
-        if img_data['file']:
-            img_path = save_uploaded_image(img_data['file'], temp_dir)
-            if img_path:
-                pdf.add_image_with_caption(img_path, img_data['caption'])
-    
-    # Convergence Analysis
+    for img_data, img in zip(report_data['result_images'], images['result_images']):
+        if img:
+            pdf.add_image_with_caption(img, img_data['caption'])
+
+def render_convergence_section(pdf, report_data, images):
     pdf.add_section_header("8. CONVERGENCE ANALYSIS")
     pdf.add_section_content(report_data['convergence_analysis'])
     
     # Add convergence images
-    for img_data in report_data['convergence_images']:
-        if img_data['file']:
-            img_path = save_uploaded_image(img_data['file'], temp_dir)
-            if img_path:
-                pdf.add_image_with_caption(img_path, img_data['caption'])
+    for img_data, img in zip(report_data['convergence_images'], images['convergence_images']):
+        if img:
+            pdf.add_image_with_caption(img, img_data['caption'])
     
-    # Validation
+    # Residual plots drawn from solver logs
+    for log in report_data.get('residual_logs', []):
+        try:
+            with profile_step(pdf.profiler, f"Residual log: {log['caption']}"):
+                plot = load_residual_plot(log['file'])
+        except Exception:
+            pdf.set_font('Arial', 'I', 10)
+            pdf.cell(0, 8, f"[Residual log could not be read: {log['caption']}]", 0, 1, 'C')
+            pdf.ln(5)
+            continue
+        pdf.add_line_plot(plot['series'], log['caption'], x_label=plot['x_label'])
+
+def render_validation_section(pdf, report_data, images):
     pdf.add_section_header("9. VALIDATION & VERIFICATION")
     pdf.add_section_content(report_data['validation'])
-    
-    # Formulas
+
+def render_formulas_section(pdf, report_data, images):
     if report_data['formulas']:
-        pdf.add_page()
+        pdf.start_new_page()
         pdf.add_section_header("GOVERNING EQUATIONS & FORMULAS")
         for i, formula in enumerate(report_data['formulas']):
             if formula['description'] and formula['formula']:
                 pdf.add_formula_box(f"Equation {i+1}: {formula['description']}", formula['formula'])
-    
-    # Conclusions
+
+def render_conclusions_section(pdf, report_data, images):
     pdf.add_section_header("10. CONCLUSIONS & RECOMMENDATIONS")
     pdf.add_section_content(report_data['conclusions'])
+
+# Report sections in document order: (key, label, report_data fields read, renderer)
+REPORT_SECTIONS = [
+    ('title_page', "Title Page",
+     ('title', 'project_name', 'analyst', 'company', 'date', 'version', 'cfd_software'), render_title_section),
+    ('contents', "Table of Contents", (), render_contents_section),
+    ('executive_summary', "1. Executive Summary", ('executive_summary',), render_executive_summary_section),
+    ('problem_definition', "2. Problem Definition & Objectives", ('problem_definition',), render_problem_definition_section),
+    ('geometry', "3. Geometry & Domain", ('geometry_description',), render_geometry_section),
+    ('mesh', "4. Mesh Generation & Quality", ('mesh_details', 'mesh_quality_data'), render_mesh_section),
+    ('boundary_conditions', "5. Boundary Conditions",
+     ('boundary_conditions', 'boundary_conditions_table'), render_boundary_conditions_section),
+    ('methodology', "6. Methodology & Solution Setup", ('methodology', 'solution_parameters'), render_methodology_section),
+    ('results', "7. Results & Discussion", ('results', 'result_images', 'image_dpi'), render_results_section),
+    ('convergence', "8. Convergence Analysis",
+     ('convergence_analysis', 'convergence_images', 'residual_logs', 'image_dpi'), render_convergence_section),
+    ('validation', "9. Validation & Verification", ('validation',), render_validation_section),
+    ('formulas', "Governing Equations & Formulas", ('formulas',), render_formulas_section),
+    ('conclusions', "10. Conclusions & Recommendations", ('conclusions',), render_conclusions_section),
+]
+
+# Resolution of the low-res image proxies used by draft previews
+DRAFT_IMAGE_DPI = 30
+
+def source_fingerprint(source):
+    """Stable identifier for an uploaded file, file-like object or path"""
+    if hasattr(source, 'fingerprint'):
+        return source.fingerprint()
+    if isinstance(source, (str, os.PathLike)):
+        try:
+            stat = os.stat(source)
+        except OSError:
+            return os.fspath(source)
+        return f"{os.fspath(source)}:{stat.st_size}:{stat.st_mtime_ns}"
+    # Streamlit assigns each upload a unique file_id; avoid rehashing its bytes
+    file_id = getattr(source, 'file_id', None)
+    if file_id:
+        return file_id
+    return hashlib.sha256(read_image_bytes(source)).hexdigest()
+
+def section_fingerprints(report_data):
+    """Hash each section's slice of report_data (plus the page chrome inputs)"""
+    chrome = json.dumps(report_data['company_logo'], default=source_fingerprint)
+    fingerprints = {}
+    for key, _, fields, _ in REPORT_SECTIONS:
+        section_slice = {field: report_data.get(field) for field in fields}
+        payload = json.dumps([key, chrome, section_slice], sort_keys=True, default=source_fingerprint)
+        fingerprints[key] = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    return fingerprints
+
+def render_sections(report_data, section_keys, draft=False, image_workers=None, generated_at=None):
+    """Render the given sections, each starting on its own page, into one PDF.
+
+    Draft renders embed low-resolution image proxies and only preprocess
+    the images the selected sections use. generated_at is stamped as in
+    create_professional_pdf.
+    """
+    image_dpi = DRAFT_IMAGE_DPI if draft else report_data.get('image_dpi')
+    pdf = pdf_generator_class()(image_dpi=image_dpi)
+    pdf.generated_at = generation_timestamp(generated_at)
+    pdf.set_creation_date(pdf.generated_at)
+    sections = [section for section in REPORT_SECTIONS if section[0] in section_keys]
+    image_keys = {'company_logo'}
+    for _, _, fields, _ in sections:
+        image_keys.update(field for field in fields if field.endswith('_images'))
+    
+    images = preprocess_report_images(
+        report_data,
+        figure_max_width=target_pixel_width(pdf.FIGURE_WIDTH, image_dpi),
+        logo_max_width=target_pixel_width(pdf.LOGO_WIDTH, image_dpi),
+        workers=image_workers,
+        keys=image_keys,
+    )
+    pdf.company_logo = images['company_logo']
+    for _, _, _, render in sections:
+        pdf.start_new_page()
+        render(pdf, report_data, images)
+    return pdf
+
+def render_draft_preview(report_data, section_keys, generated_at=None):
+    """Return draft PDF bytes for the given sections, served from the section cache.
+
+    The cache key combines the fingerprints of the requested sections with
+    the renderer fingerprint and generation time that full builds are keyed
+    on (see report_cache_key), so re-previewing an unchanged section costs
+    a hash and a file read, and a new footer date or renderer re-renders it.
+    """
+    generated_at = generation_timestamp(generated_at)
+    fingerprints = section_fingerprints(report_data)
+    keys = [key for key, _, _, _ in REPORT_SECTIONS if key in section_keys]
+    cache_key = ContentCache.make_key(
+        ' '.join(fingerprints[key] for key in keys).encode('ascii'),
+        {'draft_dpi': DRAFT_IMAGE_DPI, 'renderer': renderer_fingerprint(), 'generated_at': generated_at.isoformat()}
+    )
+    pdf_bytes = section_cache.read(cache_key)
+    if pdf_bytes is None:
+        pdf_bytes = render_sections(report_data, keys, draft=True, generated_at=generated_at).output_bytes()
+        try:
+            section_cache.put(cache_key, pdf_bytes)
+        except OSError:
+            pass
+    return pdf_bytes
+
+def create_professional_pdf(report_data, image_workers=None, profiler=None, progress=None, generated_at=None,
+                            streaming=False, dry_run=False):
+    """Generate professional PDF report.
+
+    Pass a ReportProfiler to record per-stage, per-section and per-image
+    timings; it stays attached to the returned generator so output_bytes()
+    is measured too. progress(done, total, label) is called before image
+    preprocessing and before each section. Images that could not be
+    loaded are left out and listed in pdf.image_errors. The output only
+    depends on report_data and generated_at (see generation_timestamp).
+    streaming=True keeps image data in a temporary spill file rather than
+    in memory; write such a document with pdf.output_file(). dry_run=True
+    lays the report out with ImagePlaceholders (see plan_report): pages
+    break exactly as in the real build, but no image is decoded and body
+    text, table cells and images are not drawn.
+    pdf.section_pages maps each section key to the page it starts on.
+    """
+    pdf = pdf_generator_class()(image_dpi=report_data.get('image_dpi'))
+    pdf.profiler = profiler
+    pdf.dry_run = dry_run
+    if streaming:
+        pdf.spill = SpillFile()
+    pdf.generated_at = generation_timestamp(generated_at)
+    pdf.set_creation_date(pdf.generated_at)
+    steps = len(REPORT_SECTIONS) + 1
+    if progress:
+        progress(0, steps, "Image preprocessing")
+    
+    # Prepare all images up front in parallel; layout consumes them in order
+    with profile_step(profiler, "Image preprocessing", kind='stage'):
+        images = preprocess_report_images(
+            report_data,
+            figure_max_width=target_pixel_width(pdf.FIGURE_WIDTH, pdf.image_dpi),
+            logo_max_width=target_pixel_width(pdf.LOGO_WIDTH, pdf.image_dpi),
+            workers=image_workers,
+            profiler=profiler,
+            spill=pdf.spill,
+            dry_run=dry_run,
+        )
+    pdf.image_errors = images['errors']
+    pdf.image_encodings = images['encodings']
+    if profiler:
+        profiler.image_encodings = images['encodings']
+    
+    # Set company logo if available
+    pdf.company_logo = images['company_logo']
+    
+    pdf.section_pages = {}
+    for done, (key, label, _, render) in enumerate(REPORT_SECTIONS, 1):
+        if progress:
+            progress(done, steps, label)
+        page, headers = pdf.page, len(pdf.section_header_pages)
+        with profile_step(profiler, label):
+            render(pdf, report_data, images)
+        # The page of the section's header; the title page has none
+        if len(pdf.section_header_pages) > headers:
+            pdf.section_pages[key] = pdf.section_header_pages[headers]
+        elif pdf.page > page:
+            pdf.section_pages[key] = page + 1
+    
+    return pdf
+
+# The pre-generation checklist warns about reports beyond these sizes
+REPORT_WARN_BYTES = int(os.environ.get('PDFC_REPORT_WARN_MB', '50')) * 1024 * 1024
+REPORT_WARN_PAGES = int(os.environ.get('PDFC_REPORT_WARN_PAGES', '300'))
+
+# Size model of dry runs (see estimate_pdf_bytes): drawn page content is
+# compressed for a sample of pages and extrapolated, skipped content is
+# taken to compress to SKIPPED_CONTENT_RATIO; each embedded font subset
+# costs about FONT_BYTES plus GLYPH_BYTES per glyph (outline, width and
+# ToUnicode entry), each page PAGE_BYTES of objects, plus DOCUMENT_BYTES
+PLAN_SAMPLE_PAGES = 12
+ESTIMATED_SKIPPED_CONTENT_RATIO = 0.18
+ESTIMATED_FONT_BYTES, ESTIMATED_GLYPH_BYTES = 400, 110
+ESTIMATED_PAGE_BYTES, ESTIMATED_DOCUMENT_BYTES = 400, 2500
+
+def estimate_pdf_bytes(pdf):
+    """Approximate size of a dry-run document once built, without serializing it.
+
+    The compression ratio of the content drawn on up to PLAN_SAMPLE_PAGES
+    evenly spread pages is applied to all drawn content; content the dry
+    run skipped (see ProfessionalPDFLayout.skip_content) is only counted.
+    Fonts are estimated from the glyphs used rather than subsetted, images
+    from pdf.image_encodings.
+    """
+    import zlib
+    
+    pages = list(pdf.pages.values())
+    drawn = [page for page in pages if len(page.contents) > 0]
+    step = max(1, len(drawn) // PLAN_SAMPLE_PAGES)
+    sample = b''.join(bytes(page.contents) for page in drawn[::step])
+    ratio = len(zlib.compress(sample)) / len(sample) if sample and pdf.compress else 1.0
+    content = (sum(len(page.contents) for page in drawn) * ratio
+               + sum(pdf.skipped_content.values()) * (ESTIMATED_SKIPPED_CONTENT_RATIO if pdf.compress else 1.0))
+    
+    fonts = glyphs = 0
+    for fontkey, font in pdf.fonts.items():
+        subset = getattr(font, 'subset', None)
+        if subset is None:
+            continue  # Core fonts are not embedded
+        for char in pdf.skipped_chars.get(fontkey, ()):
+            subset.pick(ord(char))
+        fonts += 1
+        glyphs += len(subset)
+    
+    return round(content + fonts * ESTIMATED_FONT_BYTES + glyphs * ESTIMATED_GLYPH_BYTES
+                 + len(pages) * ESTIMATED_PAGE_BYTES + ESTIMATED_DOCUMENT_BYTES
+                 + sum(info['output_bytes'] for info in pdf.image_encodings))
+
+def plan_report(report_data, generated_at=None, image_workers=None):
+    """Lay a report out without building it.
+
+    Runs the page layout against image placeholders (see
+    create_professional_pdf(dry_run=True)): body text is line-broken and
+    table rows are measured, but neither is drawn, and nothing is encoded,
+    subsetted or serialized. Returns a dict with the exact page count, the
+    'sections' as (label, start page) pairs, the 'estimated_bytes' of the
+    PDF (see estimate_pdf_bytes), the 'image_errors' and the 'seconds' it
+    took.
+    """
+    start = time.perf_counter()
+    pdf = create_professional_pdf(report_data, image_workers, generated_at=generated_at, dry_run=True)
+    labels = {key: label for key, label, _, _ in REPORT_SECTIONS}
+    return {
+        'pages': pdf.page_no(),
+        'sections': [(labels[key], page) for key, page in pdf.section_pages.items()],
+        'estimated_bytes': estimate_pdf_bytes(pdf),
+        'image_errors': pdf.image_errors,
+        'seconds': time.perf_counter() - start,
+    }
+
+def generation_timestamp(value=None):
+    """Generation time stamped into a report (footer date and PDF metadata).
+
+    Accepts a datetime or an ISO 8601 string; naive values are local time.
+    Defaults to the start of the current day, so identical inputs give
+    byte-identical PDFs all day long.
+    """
+    if value is None:
+        value = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    elif isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value if value.tzinfo else value.astimezone()
+
+def renderer_fingerprint():
+    """Hash of what besides report_data shapes the PDF: this module, fpdf and the fonts found"""
+    global _renderer_fingerprint
+    if _renderer_fingerprint is None:
+        import importlib.metadata
+        import importlib.util
+        
+        digest = hashlib.sha256()
+        with open(__file__, 'rb') as f:
+            digest.update(f.read())
+        # Package metadata: cache hits do not need to import fpdf
+        digest.update(json.dumps([importlib.metadata.version('fpdf2'), font_registry.files(),
+                                  importlib.util.find_spec('matplotlib') is not None], sort_keys=True).encode('utf-8'))
+        _renderer_fingerprint = digest.hexdigest()
+    return _renderer_fingerprint
+
+_renderer_fingerprint = None
+
+def report_cache_key(report_data, generated_at):
+    """Content hash of a report: its data, input file contents and generation time"""
+    data = dict(report_data)
+    # File paths are keyed on their size and mtime, not just the name
+    if data.get('company_logo'):
+        data['company_logo'] = source_fingerprint(data['company_logo'])
+    for key in ('result_images', 'convergence_images', 'residual_logs'):
+        data[key] = [dict(entry, file=source_fingerprint(entry['file'])) for entry in data.get(key, [])]
+    payload = json.dumps([data, generated_at.isoformat()], sort_keys=True, default=source_fingerprint)
+    return ContentCache.make_key(payload.encode('utf-8'), {'renderer': renderer_fingerprint()})
+
+def pdf_page_count(pdf_bytes):
+    # fpdf writes the page tree root, with its /Count, as object 1
+    match = re.search(rb'\n1 0 obj\n<<\n/Count (\d+)', pdf_bytes)
+    return int(match.group(1)) if match else 0
+
+def pdf_file_page_count(path):
+    # Object 1 directly follows the file header
+    with open(path, 'rb') as f:
+        return pdf_page_count(f.read(4096))
+
+def cached_report(key, output_path=None):
+    """build_report's result for a report cache hit, else None.
+
+    With output_path the cached PDF is copied into that file.
+    """
+    if output_path:
+        cached_path = report_cache.get(key)
+        if cached_path is None:
+            return None
+        try:
+            shutil.copyfile(cached_path, output_path)
+        except OSError:
+            return None  # Evicted meanwhile: render it
+        return {'bytes': None, 'pages': pdf_file_page_count(output_path), 'image_errors': [],
+                'image_encodings': [], 'cached': True}
+    pdf_bytes = report_cache.read(key)
+    if pdf_bytes is None:
+        return None
+    return {'bytes': pdf_bytes, 'pages': pdf_page_count(pdf_bytes), 'image_errors': [],
+            'image_encodings': [], 'cached': True}
+
+def write_report(pdf, key, output_path=None):
+    """Serialize a laid-out report, caching it under key; build_report's result.
+
+    With output_path the PDF is streamed into that file and 'bytes' is
+    None. Reports with images that failed to load are not cached.
+    """
+    pdf_bytes = None
+    if output_path:
+        pdf.output_file(output_path)
+    else:
+        pdf_bytes = pdf.output_bytes()
+    if not pdf.image_errors:
+        try:
+            if output_path:
+                report_cache.put_file(key, output_path)
+            else:
+                report_cache.put(key, pdf_bytes)
+        except OSError:
+            pass  # Read-only cache directory: just skip caching
+    return {'bytes': pdf_bytes, 'pages': pdf.page_no(), 'image_errors': pdf.image_errors,
+            'image_encodings': pdf.image_encodings, 'cached': False}
+
+def build_report(report_data, generated_at=None, image_workers=None, profiler=None, progress=None,
+                 output_path=None):
+    """Build a report, served from the report cache when unchanged.
+
+    Returns a dict with the PDF 'bytes', its 'pages', the 'image_errors'
+    and 'image_encodings' of the build (empty on a cache hit) and whether
+    it was 'cached'. With output_path the PDF is streamed into that file
+    in bounded memory (create_professional_pdf(streaming=True)) and 'bytes'
+    is None. Profiled builds always render (and refresh the cache entry).
+    Reports with images that failed to load are not cached.
+    """
+    generated_at = generation_timestamp(generated_at)
+    key = report_cache_key(report_data, generated_at)
+    if profiler is None:
+        report = cached_report(key, output_path)
+        if report is not None:
+            return report
+    
+    pdf = create_professional_pdf(report_data, image_workers, profiler, progress, generated_at,
+                                  streaming=bool(output_path))
+    if progress:
+        progress(1, 1, "PDF output")
+    return write_report(pdf, key, output_path)
+
+# Parametric sweeps: one report over many cases sharing a base report_data.
+# Sections whose content is the same in every case are rendered once; the
+# others are repeated per case, after tables comparing the cases. Comparison
+# tables are split into groups of at most SWEEP_TABLE_COLUMNS value columns.
+SWEEP_TABLE_COLUMNS = 5
+
+def format_sweep_value(value):
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return '' if value is None else str(value)
+
+def sweep_case_sections(cases):
+    """Keys of the REPORT_SECTIONS whose content differs between cases (the title page is always shared)"""
+    fingerprints = [section_fingerprints(case['report_data']) for case in cases]
+    return [key for key, _, _, _ in REPORT_SECTIONS
+            if key != 'title_page' and len({f[key] for f in fingerprints}) > 1]
+
+def render_sweep_comparison(pdf, cases):
+    pdf.start_new_page()
+    pdf.add_section_header("CASE COMPARISON")
+    for field, title in (('parameters', "Case Parameters"), ('metrics', "Key Results")):
+        names = list(dict.fromkeys(name for case in cases for name in case[field]))
+        if not names:
+            continue
+        pdf.add_section_header(title, level=2)
+        for start in range(0, len(names), SWEEP_TABLE_COLUMNS):
+            group = names[start:start + SWEEP_TABLE_COLUMNS]
+            pdf.add_table(["Case"] + group, (
+                [case['name']] + [format_sweep_value(case[field].get(name)) for name in group]
+                for case in cases
+            ))
+
+def render_sweep_case(pdf, case, number, section_keys, images):
+    pdf.start_new_page()
+    pdf.add_section_header(f"CASE {number}: {case['name'].upper()}")
+    rows = [[name, format_sweep_value(value)] for field in ('parameters', 'metrics')
+            for name, value in case[field].items()]
+    if rows:
+        pdf.add_table(["Parameter", "Value"], rows)
+    for key, _, _, render in REPORT_SECTIONS:
+        if key in section_keys:
+            render(pdf, case['report_data'], images)
+
+def prepare_sweep_case(assets, figure_max_width):
+    """Per-case preprocessing of a sweep (process pool worker).
+
+    assets holds the image lists and residual logs of the case's own
+    sections. The images are returned as preprocess_report_images does;
+    residual logs are only parsed into the residual cache, where layout
+    picks them up.
+    """
+    for log in assets.pop('residual_logs', []):
+        try:
+            load_residual_plot(log['file'])
+        except Exception:
+            pass  # Reported where the section is laid out
+    return preprocess_report_images(assets, figure_max_width=figure_max_width, workers=1, keys=tuple(assets))
+
+def create_sweep_pdf(report_data, cases, workers=None, generated_at=None, streaming=False):
+    """Lay out one report over the cases of a parametric sweep (see load_sweep_spec).
+
+    The title page comes from report_data, shared sections from the
+    first case. Images and residual logs of the per-case sections are
+    prepared across a process pool of workers while the shared sections
+    are laid out; the cases then follow in order as they become ready.
+    An image used by several cases is embedded once (fpdf keys images by
+    content). Images that could not be loaded are listed in
+    pdf.image_errors, prefixed with their case name. streaming=True parks
+    image data in a spill file as create_professional_pdf(streaming=True)
+    does, each case's as it is laid out; write such a document with
+    pdf.output_file().
+    """
+    pdf = pdf_generator_class()(image_dpi=report_data.get('image_dpi'))
+    if streaming:
+        pdf.spill = SpillFile()
+    pdf.generated_at = generation_timestamp(generated_at)
+    pdf.set_creation_date(pdf.generated_at)
+    case_keys = sweep_case_sections(cases)
+    asset_fields = [field for key, _, fields, _ in REPORT_SECTIONS if key in case_keys
+                    for field in fields if field.endswith('_images') or field == 'residual_logs']
+    shared_images = {'company_logo'}
+    for key, _, fields, _ in REPORT_SECTIONS:
+        if key not in case_keys:
+            shared_images.update(field for field in fields if field.endswith('_images'))
+    figure_max_width = target_pixel_width(pdf.FIGURE_WIDTH, pdf.image_dpi)
     
+    pool = None
+    if asset_fields:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(cases)))
+    with pool or contextlib.nullcontext():
+        prepared = [
+            pool.submit(prepare_sweep_case, {field: case['report_data'][field] for field in asset_fields},
+                        figure_max_width) if pool else None
+            for case in cases
+        ]
+        
+        images = preprocess_report_images(
+            cases[0]['report_data'],
+            figure_max_width=figure_max_width,
+            logo_max_width=target_pixel_width(pdf.LOGO_WIDTH, pdf.image_dpi),
+            keys=shared_images,
+            spill=pdf.spill,
+        )
+        pdf.image_errors = images['errors']
+        pdf.image_encodings = images['encodings']
+        pdf.company_logo = images['company_logo']
+        
+        render_title_section(pdf, report_data, images)
+        for key, _, _, render in REPORT_SECTIONS[1:]:
+            if key not in case_keys:
+                render(pdf, cases[0]['report_data'], images)
+        render_sweep_comparison(pdf, cases)
+        
+        for number, case in enumerate(cases, 1):
+            future, prepared[number - 1] = prepared[number - 1], None
+            case_images = future.result() if future else images
+            if future:
+                pdf.image_errors += [f"{case['name']}: {error}" for error in case_images['errors']]
+                pdf.image_encodings += case_images['encodings']
+                if pdf.spill is not None:
+                    for field in asset_fields:
+                        if field.endswith('_images'):
+                            case_images[field] = [data and pdf.spill.park(data) for data in case_images[field]]
+            render_sweep_case(pdf, case, number, case_keys, case_images)
     return pdf
 
+def build_sweep_report(report_data, cases, generated_at=None, workers=None, output_path=None):
+    """build_report for a parametric sweep: the consolidated PDF of all cases, cached as a whole.
+
+    With output_path the PDF is streamed into that file and 'bytes' is
+    None, as with build_report.
+    """
+    generated_at = generation_timestamp(generated_at)
+    payload = json.dumps([report_cache_key(report_data, generated_at)] + [
+        [case['name'], case['parameters'], case['metrics'], report_cache_key(case['report_data'], generated_at)]
+        for case in cases
+    ], sort_keys=True, default=str)
+    key = ContentCache.make_key(payload.encode('utf-8'), {'sweep': 1})
+    report = cached_report(key, output_path)
+    if report is not None:
+        return report
+    
+    pdf = create_sweep_pdf(report_data, cases, workers, generated_at, streaming=bool(output_path))
+    return write_report(pdf, key, output_path)
+
+# Background report builds: REPORT_WORKERS run at once, at most
+# REPORT_QUEUE_LIMIT wait; finished builds are kept for REPORT_JOB_TTL seconds
+REPORT_WORKERS = int(os.environ.get('PDFC_REPORT_WORKERS', '2'))
+REPORT_QUEUE_LIMIT = int(os.environ.get('PDFC_REPORT_QUEUE', '8'))
+REPORT_JOB_TTL = 3600
+# Cancellation flags shared with the worker processes, indexed by job number
+# modulo their count (far more than the jobs that can be in flight)
+REPORT_CANCEL_SLOTS = 1024
+
+class ReportCancelled(Exception):
+    pass
+
+def worker_module():
+    """This file as an importable module, for work sent to worker processes.
+
+    Under Streamlit the script runs as a new __main__ module on every
+    rerun, which pickle cannot refer to: functions and classes sent to
+    worker processes are taken from the file imported under its own name.
+    """
+    name = os.path.splitext(os.path.basename(__file__))[0]
+    module = sys.modules.get(name)
+    if module is None:
+        import importlib.util
+        
+        spec = importlib.util.spec_from_file_location(name, os.path.abspath(__file__))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return module
+
+# (progress queue, cancellation flags) of a report worker process
+report_worker_channels = None
+
+def init_report_worker(events, cancelled):
+    global report_worker_channels
+    report_worker_channels = (events, cancelled)
+
+def run_report_job(job_id, number, report_data, profile=False, cprofile=False):
+    """Build a report in a ReportJobQueue worker process.
+
+    Progress goes back to the queue as (job id, fraction, step) events.
+    Returns (status, result, detail): ('done', build_report result,
+    profile dict or None), ('cancelled', None, None) or ('failed', None,
+    error message).
+    """
+    events, cancelled = report_worker_channels
+    
+    def update(done, total, label):
+        if cancelled[number % len(cancelled)] == number:
+            raise ReportCancelled()
+        events.put((job_id, done / total, label))
+    
+    profiler = ReportProfiler(cprofile=cprofile) if profile else None
+    try:
+        update(0, 1, "Starting")
+        with profiler or contextlib.nullcontext():
+            result = build_report(report_data, profiler=profiler, progress=update)
+    except ReportCancelled:
+        return 'cancelled', None, None
+    except Exception as e:
+        return 'failed', None, str(e)
+    return 'done', result, profiler and dict(profiler.to_dict(), cprofile=profiler.cprofile_bytes())
+
+class ReportJob:
+    """One queued report build; its fields are updated as the worker process reports back"""
+    def __init__(self, number, owner, file_name, cancelled):
+        self.id = uuid.uuid4().hex[:12]
+        self.number = number
+        self.owner = owner
+        self.file_name = file_name
+        self.status = 'queued'
+        self.progress = 0.0
+        self.step = "Waiting for a worker"
+        self.result = None
+        self.profile = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.future = None
+        self._cancelled = cancelled
+        self._lock = threading.Lock()
+    
+    @property
+    def active(self):
+        return self.status in ('queued', 'running')
+    
+    def cancel(self):
+        """Request cancellation; a running build stops before its next section"""
+        self._cancelled[self.number % len(self._cancelled)] = self.number
+        if self.future is not None:
+            self.future.cancel()
+    
+    def update(self, progress, step):
+        # Progress events can arrive after the result
+        with self._lock:
+            if self.active:
+                self.status, self.progress, self.step = 'running', progress, step
+    
+    def finish(self, future):
+        result = profile = error = None
+        if future.cancelled():
+            status = 'cancelled'
+        else:
+            try:
+                status, result, detail = future.result()
+            except Exception as e:
+                # The worker process died, or the job could not be sent to it
+                status, detail = 'failed', f"{type(e).__name__}: {e}"
+            if status == 'done':
+                profile = detail
+            elif status == 'failed':
+                error = detail
+        with self._lock:
+            self.result, self.profile, self.error = result, profile, error
+            self.status, self.finished = status, time.time()
+
+class ReportJobQueue:
+    """Bounded pool of report build processes shared by every session.
+
+    Jobs are looked up by id, so a session finds its builds again after
+    reruns. Builds run in worker processes, one at a time each: layout is
+    pure Python and would take turns on the GIL in threads, and a profile
+    measures its own build only. Progress comes back over a queue relayed
+    by a thread; the font, formula, image and report caches are shared on
+    disk.
+    """
+    def __init__(self, workers=REPORT_WORKERS, max_queued=REPORT_QUEUE_LIMIT, ttl=REPORT_JOB_TTL):
+        import multiprocessing
+        
+        self.workers = workers
+        self.max_queued = max_queued
+        self.ttl = ttl
+        # spawn, not fork: the server process runs threads
+        self._context = multiprocessing.get_context('spawn')
+        self._events = self._context.Queue()
+        self._cancelled = self._context.RawArray('q', REPORT_CANCEL_SLOTS)
+        self._worker = worker_module()
+        self._pool = self._new_pool()
+        self._numbers = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._relay_progress, name='report-progress', daemon=True).start()
+    
+    def _new_pool(self):
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=self._context,
+            initializer=self._worker.init_report_worker, initargs=(self._events, self._cancelled)
+        )
+    
+    def submit(self, report_data, owner, file_name, profile=False, cprofile=False):
+        """Queue a build of a snapshot of report_data; raises ValueError when the queue is full"""
+        from concurrent.futures.process import BrokenProcessPool
+        
+        with self._lock:
+            self._expire()
+            if sum(job.status == 'queued' for job in self._jobs.values()) >= self.max_queued:
+                raise ValueError("the report queue is full, try again in a moment")
+            job = ReportJob(next(self._numbers), owner, file_name, self._cancelled)
+            # Upload handles are copied as those of the worker module
+            args = (job.id, job.number, copy.deepcopy(report_data), profile, cprofile)
+            try:
+                job.future = self._pool.submit(self._worker.run_report_job, *args)
+            except BrokenProcessPool:
+                # A worker process died (killed for memory, say): start over
+                self._pool = self._new_pool()
+                job.future = self._pool.submit(self._worker.run_report_job, *args)
+            self._jobs[job.id] = job
+        job.future.add_done_callback(job.finish)
+        return job
+    
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+    
+    def remove(self, job_id):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job:
+            job.cancel()
+    
+    def _relay_progress(self):
+        while True:
+            job_id, progress, step = self._events.get()
+            job = self.get(job_id)
+            if job is not None:
+                job.update(progress, step)
+    
+    def _expire(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished and now - job.finished > self.ttl]:
+            del self._jobs[job_id]
+
+@st.cache_resource
+def report_job_queue():
+    """The process-wide report job queue"""
+    return ReportJobQueue()
+
+# Report table columns edited as dropdowns, with their standard choices
+TABLE_CHOICES = {
+    'mesh_quality_data': {"Status": ["Good", "Acceptable", "Poor"]},
+    'boundary_conditions_table': {"Type": ["Inlet", "Outlet", "Wall", "Symmetry", "Pressure Outlet", "Mass Flow Inlet"]},
+}
+
+def choice_options(options, values):
+    """Dropdown options that keep values imported from outside the list"""
+    extra = sorted({value for value in values if value and value not in options})
+    return extra + options
+
+def table_csv_import(key):
+    """CSV uploader that replaces the rows of report table `key`"""
+    uploaded = st.file_uploader(
+        f"Import rows from CSV ({', '.join(TABLE_COLUMNS[key])})",
+        type=["csv"],
+        key=f"{key}_csv"
+    )
+    if uploaded and st.button("Replace Rows with CSV", key=f"{key}_csv_import"):
+        try:
+            rows = read_uploaded_csv(uploaded, TABLE_COLUMNS[key])
+        except (UnicodeDecodeError, csv.Error) as e:
+            st.error(f"Could not read {uploaded.name}: {e}")
+            return
+        st.session_state.report_data[key] = rows
+        st.rerun()
+
+@st.fragment
+def table_editor(key):
+    """Grid editor for report table `key`, rows added and deleted in place.
+
+    Runs as a fragment, so editing a cell reruns only the editor instead
+    of the whole page. The grid keeps being given the rows it started
+    with (its widget state holds the edits) and writes the edited rows
+    back to report_data; when something else replaces those rows (CSV or
+    monitor import), the grid restarts from them.
+    """
+    import pandas as pd
+    
+    columns = TABLE_COLUMNS[key]
+    editor_key, rows_key, output_key = f"{key}_editor", f"{key}_editor_rows", f"{key}_editor_output"
+    if st.session_state.report_data[key] is not st.session_state.get(output_key):
+        if editor_key in st.session_state:
+            del st.session_state[editor_key]
+        st.session_state[rows_key] = pd.DataFrame(st.session_state.report_data[key], columns=columns, dtype=str)
+    rows = st.session_state[rows_key]
+    
+    column_config = {}
+    for column, options in TABLE_CHOICES.get(key, {}).items():
+        column_config[column] = st.column_config.SelectboxColumn(column, options=choice_options(options, rows[column]))
+    edited = st.data_editor(rows, key=editor_key, num_rows="dynamic", hide_index=True, column_config=column_config)
+    st.session_state.report_data[key] = st.session_state[output_key] = edited.fillna("").astype(str).values.tolist()
+
+def selected_source(uploaded_file, server_path):
+    """The uploaded file, else an existing server path; reports what is missing"""
+    if uploaded_file:
+        return uploaded_file
+    server_path = server_path.strip()
+    if not server_path:
+        st.error("Select a file or enter its path")
+    elif not os.path.isfile(server_path):
+        st.error(f"File not found: {server_path}")
+    else:
+        return server_path
+    return None
+
+def monitor_statistics_import():
+    """Fill solution_parameters with windowed statistics of a force/monitor file"""
+    st.markdown("**Import statistics from a force/monitor file** (OpenFOAM postProcessing .dat, Fluent report file, CSV)")
+    uploaded = st.file_uploader("Select monitor file", key="monitor_file")
+    server_path = st.text_input("...or path to a monitor file on the server", key="monitor_path")
+    window = st.number_input("Statistics window (last N samples)", min_value=2, value=MONITOR_WINDOW,
+                             step=100, key="monitor_window")
+    if st.button("Add Monitor Statistics", key="add_monitor_statistics"):
+        source = selected_source(uploaded, server_path)
+        if source is None:
+            return
+        try:
+            with st.spinner("Reading monitor file..."):
+                statistics = monitor_statistics(source, int(window))
+        except Exception as e:
+            st.error(f"Could not read monitor file: {e}")
+            return
+        # Replace earlier statistics of the same quantities
+        rows = monitor_statistics_rows(statistics)
+        names = {row[0] for row in rows}
+        st.session_state.report_data['solution_parameters'] = [
+            row for row in st.session_state.report_data['solution_parameters'] if row[0] not in names
+        ] + rows
+        st.rerun()
+
+def session_report_job():
+    """This session's latest report build, while the job queue still holds it"""
+    job_id = st.session_state.get('report_job')
+    return report_job_queue().get(job_id) if job_id else None
+
+def report_job_panel(job):
+    """Progress and result of this session's build, polled while it runs"""
+    if job.status == 'done':
+        st.session_state.last_profile = job.profile
+    st.fragment(report_job_status, run_every=1 if job.active else None)(job.active)
+
+def report_job_status(polling):
+    job = session_report_job()
+    if job is None:
+        return
+    if polling and not job.active:
+        # The build finished: refresh the page (stops polling, shows its profile)
+        st.rerun()
+    if job.active:
+        st.progress(job.progress, text=f"Generating report: {job.step}")
+        if st.button("Cancel", key=f"cancel_report_{job.id}"):
+            job.cancel()
+            st.caption("Cancelling after the current section...")
+    elif job.status == 'done':
+        report = job.result
+        st.success("✅ Professional CFD report generated successfully!")
+        for error in report['image_errors']:
+            st.error(f"Error loading image: {error}")
+        st.download_button(
+            label="📥 Download Professional CFD Report",
+            data=report['bytes'],
+            file_name=job.file_name,
+            mime="application/pdf",
+            use_container_width=True,
+            key=f"download_report_{job.id}"
+        )
+        st.info(f"""
+        📊 **Report Statistics:**
+        - Total pages: {report['pages']}
+        - File size: {len(report['bytes']) / 1024:.1f} KB
+        - Generated: {datetime.datetime.fromtimestamp(job.finished).strftime('%Y-%m-%d %H:%M:%S')}{' (unchanged report, from cache)' if report['cached'] else ''}
+        """)
+        if report['image_encodings']:
+            image_encoding_table(report['image_encodings'])
+    elif job.status == 'failed':
+        st.error(f"Error generating PDF: {job.error}")
+        st.error("Please check that all images are valid and try again.")
+    else:
+        st.warning("Report generation was cancelled.")
+
+def image_encoding_table(encodings):
+    """Codec, size and encode time of each embedded image"""
+    source = sum(info['source_bytes'] for info in encodings)
+    output = sum(info['output_bytes'] for info in encodings)
+    with st.expander(f"🖼️ Image encoding: {source / 1024:.0f} KB of sources embedded as {output / 1024:.0f} KB"):
+        st.dataframe(
+            [
+                {
+                    'Image': info['image'],
+                    'Codec': info['codec'] + (' (cached)' if info['cached'] else ''),
+                    'Source (KB)': round(info['source_bytes'] / 1024, 1),
+                    'Embedded (KB)': round(info['output_bytes'] / 1024, 1),
+                    'Encode (ms)': round(info['encode_s'] * 1000, 1),
+                }
+                for info in encodings
+            ],
+            use_container_width=True
+        )
+
+def session_layout_plan(report_data, refresh=False):
+    """plan_report of the edited report, laid out only when refresh is set.
+
+    The last plan is kept in the session and returned while the report is
+    unchanged, so plain reruns neither lay the report out nor load fpdf.
+    """
+    cached = st.session_state.get('layout_plan')
+    if not refresh and cached is None:
+        return None
+    key = report_cache_key(report_data, generation_timestamp())
+    if refresh:
+        try:
+            with st.spinner("Laying out the report..."):
+                plan = plan_report(report_data)
+        except Exception as e:
+            st.error(f"Could not lay out the report: {e}")
+            return None
+        st.session_state.layout_plan = cached = (key, plan)
+    return cached[1] if cached[0] == key else None
+
+def upload_session_id():
+    """Identifier of this browser session in the blob store"""
+    if 'upload_session' not in st.session_state:
+        st.session_state.upload_session = uuid.uuid4().hex
+    return st.session_state.upload_session
+
+def session_uploads(report_data):
+    """Blob store handles referenced by report_data"""
+    handles = [report_data['company_logo']]
+    for key in ('result_images', 'convergence_images', 'residual_logs'):
+        handles += [entry['file'] for entry in report_data[key]]
+    return [handle for handle in handles if isinstance(handle, UploadHandle)]
+
+def store_upload(uploaded_file):
+    """Copy an upload into the blob store; None (with an error shown) over quota.
+
+    Image previews are built here, so list reruns only read cached thumbnails.
+    """
+    try:
+        handle = blob_store.put(upload_session_id(), uploaded_file)
+    except ValueError as e:
+        st.error(f"Could not add {uploaded_file.name}: {e}")
+        return None
+    if handle.width is not None:
+        image_thumbnail(handle)
+    return handle
+
+def uploader_key(name):
+    """Widget key of a file uploader; clear_uploader swaps in a fresh, empty one"""
+    return f"{name}_{st.session_state.get(name + '_generation', 0)}"
+
+def clear_uploader(name):
+    # Dropping the old widget releases Streamlit's in-memory copy of the file
+    st.session_state[name + '_generation'] = st.session_state.get(name + '_generation', 0) + 1
+
+def default_report_data():
+    """Return a fresh report_data dict with default values"""
+    return {
+        # Basic Info
+        'title': "CFD Analysis Report",
+        'project_name': "",
+        'analyst': "",
+        'company': "",
+        'date': datetime.datetime.now().strftime("%Y-%m-%d"),
+        'version': "1.0",
+        'cfd_software': "ANSYS Fluent",
+        'company_logo': None,
+        'image_dpi': 300,
+        
+        # Report Sections
+        'executive_summary': "",
+        'problem_definition': "",
+        'geometry_description': "",
+        'mesh_details': "",
+        'boundary_conditions': "",
+        'methodology': "",
+        'results': "",
+        'convergence_analysis': "",
+        'validation': "",
+        'conclusions': "",
+        
+        # Tables and Data
+        'boundary_conditions_table': [],
+        'mesh_quality_data': [],
+        'solution_parameters': [],
+        
+        # Images
+        'result_images': [],
+        'convergence_images': [],
+        'residual_logs': [],
+        
+        # Formulas
+        'formulas': [{'description': '', 'formula': ''}]
+    }
+
 def initialize_session_state():
     """Initialize all session state variables"""
     if 'report_data' not in st.session_state:
-        st.session_state.report_data = {
-            # Basic Info
-            'title': "CFD Analysis Report",
-            'project_name': "",
-            'analyst': "",
-            'company': "",
-            'date': datetime.datetime.now().strftime("%Y-%m-%d"),
-            'version': "1.0",
-            'cfd_software': "ANSYS Fluent",
-            'company_logo': None,
-            
-            # Report Sections
-            'executive_summary': "",
-            'problem_definition': "",
-            'geometry_description': "",
-            'mesh_details': "",
-            'boundary_conditions': "",
-            'methodology': "",
-            'results': "",
-            'convergence_analysis': "",
-            'validation': "",
-            'conclusions': "",
-            
-            # Tables and Data
-            'boundary_conditions_table': [],
-            'mesh_quality_data': [],
-            'solution_parameters': [],
-            
-            # Images
-            'result_images': [],
-            'convergence_images': [],
-            
-            # Formulas
-            'formulas': [{'description': '', 'formula': ''}]
-        }
+        st.session_state.report_data = default_report_data()
 
 def main():
+    configure_page()
+    
     # Initialize session state
     initialize_session_state()
+    blob_store.track(upload_session_id(), session_uploads(st.session_state.report_data))
     
     # Main header
     st.markdown('<div class="main-header">VASTAS Professional CFD Report Generator</div>', unsafe_allow_html=True)
@@ -439,11 +3542,27 @@ def main():
         
         # Company branding
         st.markdown("#### Company Branding")
-        st.session_state.report_data['company_logo'] = st.file_uploader(
-            "Company Logo", 
-            type=["png", "jpg", "jpeg"],
-            key="logo_uploader"
-        )
+        company_logo = st.session_state.report_data['company_logo']
+        if company_logo is None:
+            uploaded_logo = st.file_uploader(
+                "Company Logo", 
+                type=["png", "jpg", "jpeg"],
+                key=uploader_key("logo_uploader")
+            )
+            if uploaded_logo:
+                handle = store_upload(uploaded_logo)
+                if handle:
+                    st.session_state.report_data['company_logo'] = handle
+                    clear_uploader("logo_uploader")
+                    st.rerun()
+        else:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.markdown(f"**Logo:** {company_logo.name}")
+            with col2:
+                if st.button("Remove", key="del_logo"):
+                    st.session_state.report_data['company_logo'] = None
+                    st.rerun()
         
         # Basic information
         st.session_state.report_data['title'] = st.text_input(
@@ -566,24 +3685,8 @@ def main():
         # Mesh Quality Table
         st.markdown("#### Mesh Quality Metrics")
         with st.expander("Add Mesh Quality Data"):
-            if st.button("Add Mesh Quality Row"):
-                st.session_state.report_data['mesh_quality_data'].append(["", "", "", ""])
-                st.rerun()
-            
-            for i, row in enumerate(st.session_state.report_data['mesh_quality_data']):
-                cols = st.columns([2, 2, 2, 2, 1])
-                with cols[0]:
-                    st.session_state.report_data['mesh_quality_data'][i][0] = st.text_input(f"Parameter {i+1}", row[0], key=f"mesh_param_{i}")
-                with cols[1]:
-                    st.session_state.report_data['mesh_quality_data'][i][1] = st.text_input(f"Value {i+1}", row[1], key=f"mesh_val_{i}")
-                with cols[2]:
-                    st.session_state.report_data['mesh_quality_data'][i][2] = st.text_input(f"Range {i+1}", row[2], key=f"mesh_range_{i}")
-                with cols[3]:
-                    st.session_state.report_data['mesh_quality_data'][i][3] = st.selectbox(f"Status {i+1}", ["Good", "Acceptable", "Poor"], key=f"mesh_status_{i}")
-                with cols[4]:
-                    if st.button("❌", key=f"del_mesh_{i}"):
-                        st.session_state.report_data['mesh_quality_data'].pop(i)
-                        st.rerun()
+            table_csv_import('mesh_quality_data')
+            table_editor('mesh_quality_data')
         
         # Boundary Conditions
         st.markdown("#### Boundary Conditions")
@@ -597,28 +3700,8 @@ def main():
         # Boundary Conditions Table
         st.markdown("#### Boundary Conditions Table")
         with st.expander("Add Boundary Condition Details"):
-            if st.button("Add Boundary Condition"):
-                st.session_state.report_data['boundary_conditions_table'].append(["", "", "", ""])
-                st.rerun()
-            
-            for i, row in enumerate(st.session_state.report_data['boundary_conditions_table']):
-                cols = st.columns([2, 2, 2, 3, 1])
-                with cols[0]:
-                    st.session_state.report_data['boundary_conditions_table'][i][0] = st.text_input(f"Boundary {i+1}", row[0], key=f"bc_name_{i}")
-                with cols[1]:
-                    st.session_state.report_data['boundary_conditions_table'][i][1] = st.selectbox(
-                        f"Type {i+1}", 
-                        ["Inlet", "Outlet", "Wall", "Symmetry", "Pressure Outlet", "Mass Flow Inlet"],
-                        key=f"bc_type_{i}"
-                    )
-                with cols[2]:
-                    st.session_state.report_data['boundary_conditions_table'][i][2] = st.text_input(f"Value {i+1}", row[2], key=f"bc_val_{i}")
-                with cols[3]:
-                    st.session_state.report_data['boundary_conditions_table'][i][3] = st.text_input(f"Description {i+1}", row[3], key=f"bc_desc_{i}")
-                with cols[4]:
-                    if st.button("❌", key=f"del_bc_{i}"):
-                        st.session_state.report_data['boundary_conditions_table'].pop(i)
-                        st.rerun()
+            table_csv_import('boundary_conditions_table')
+            table_editor('boundary_conditions_table')
         
         # Methodology
         st.markdown("#### Methodology & Solution Setup")
@@ -632,22 +3715,9 @@ def main():
         # Solution Parameters
         st.markdown("#### Solution Parameters")
         with st.expander("Add Solution Parameters"):
-            if st.button("Add Parameter"):
-                st.session_state.report_data['solution_parameters'].append(["", "", ""])
-                st.rerun()
-            
-            for i, row in enumerate(st.session_state.report_data['solution_parameters']):
-                cols = st.columns([2, 2, 3, 1])
-                with cols[0]:
-                    st.session_state.report_data['solution_parameters'][i][0] = st.text_input(f"Parameter {i+1}", row[0], key=f"sol_param_{i}")
-                with cols[1]:
-                    st.session_state.report_data['solution_parameters'][i][1] = st.text_input(f"Value {i+1}", row[1], key=f"sol_val_{i}")
-                with cols[2]:
-                    st.session_state.report_data['solution_parameters'][i][2] = st.text_input(f"Description {i+1}", row[2], key=f"sol_desc_{i}")
-                with cols[3]:
-                    if st.button("❌", key=f"del_sol_{i}"):
-                        st.session_state.report_data['solution_parameters'].pop(i)
-                        st.rerun()
+            table_csv_import('solution_parameters')
+            monitor_statistics_import()
+            table_editor('solution_parameters')
     
     with tab3:
         st.markdown('<h2 class="section-header">Results & Analysis</h2>', unsafe_allow_html=True)
@@ -667,22 +3737,25 @@ def main():
             new_result_image = st.file_uploader(
                 "Select result image", 
                 type=["png", "jpg", "jpeg"],
-                key="new_result_image"
+                key=uploader_key("new_result_image")
             )
             
             if new_result_image:
                 col1, col2 = st.columns([1, 2])
                 with col1:
-                    st.image(new_result_image, width=200)
+                    st.image(image_thumbnail(new_result_image), width=200)
                 with col2:
                     caption = st.text_input("Image Caption", key="result_caption")
                     if st.button("Add Result Image", key="add_result_img"):
-                        st.session_state.report_data['result_images'].append({
-                            'file': new_result_image,
-                            'caption': caption
-                        })
-                        st.success("Result image added!")
-                        st.rerun()
+                        handle = store_upload(new_result_image)
+                        if handle:
+                            st.session_state.report_data['result_images'].append({
+                                'file': handle,
+                                'caption': caption
+                            })
+                            clear_uploader("new_result_image")
+                            st.success("Result image added!")
+                            st.rerun()
         
         # Display current result images
         if st.session_state.report_data['result_images']:
@@ -691,7 +3764,7 @@ def main():
                 with st.container():
                     col1, col2, col3 = st.columns([1, 3, 1])
                     with col1:
-                        st.image(img_data['file'], width=150)
+                        st.image(image_thumbnail(img_data['file']), width=150)
                     with col2:
                         st.markdown(f"**Caption:** {img_data['caption']}")
                     with col3:
@@ -715,22 +3788,25 @@ def main():
             new_conv_image = st.file_uploader(
                 "Select convergence plot", 
                 type=["png", "jpg", "jpeg"],
-                key="new_conv_image"
+                key=uploader_key("new_conv_image")
             )
             
             if new_conv_image:
                 col1, col2 = st.columns([1, 2])
                 with col1:
-                    st.image(new_conv_image, width=200)
+                    st.image(image_thumbnail(new_conv_image), width=200)
                 with col2:
                     conv_caption = st.text_input("Convergence Plot Caption", key="conv_caption")
                     if st.button("Add Convergence Plot", key="add_conv_img"):
-                        st.session_state.report_data['convergence_images'].append({
-                            'file': new_conv_image,
-                            'caption': conv_caption
-                        })
-                        st.success("Convergence plot added!")
-                        st.rerun()
+                        handle = store_upload(new_conv_image)
+                        if handle:
+                            st.session_state.report_data['convergence_images'].append({
+                                'file': handle,
+                                'caption': conv_caption
+                            })
+                            clear_uploader("new_conv_image")
+                            st.success("Convergence plot added!")
+                            st.rerun()
         
         # Display current convergence images
         if st.session_state.report_data['convergence_images']:
@@ -739,7 +3815,7 @@ def main():
                 with st.container():
                     col1, col2, col3 = st.columns([1, 3, 1])
                     with col1:
-                        st.image(img_data['file'], width=150)
+                        st.image(image_thumbnail(img_data['file']), width=150)
                     with col2:
                         st.markdown(f"**Caption:** {img_data['caption']}")
                     with col3:
@@ -748,6 +3824,45 @@ def main():
                             st.rerun()
                     st.markdown("---")
         
+        # Solver residual logs
+        st.markdown("#### Solver Residual Logs")
+        with st.expander("Add Residual Log"):
+            st.markdown('<div class="info-box">Residual logs (Fluent transcript or OpenFOAM solver log) are drawn as vector convergence plots. Give logs larger than the upload limit as a path on the server.</div>', unsafe_allow_html=True)
+            new_residual_log = st.file_uploader("Select residual log", key=uploader_key("new_residual_log"))
+            residual_log_path = st.text_input("...or path to a log file on the server", key="residual_log_path")
+            residual_caption = st.text_input("Residual Plot Caption", key="residual_caption")
+            if st.button("Add Residual Log", key="add_residual_log"):
+                source = selected_source(new_residual_log, residual_log_path)
+                if new_residual_log and source is new_residual_log:
+                    source = store_upload(new_residual_log)
+                if source is not None:
+                    try:
+                        with st.spinner("Parsing residual log..."):
+                            plot = load_residual_plot(source)
+                    except Exception as e:
+                        st.error(f"Could not read residual log: {e}")
+                    else:
+                        st.session_state.report_data['residual_logs'].append({
+                            'file': source,
+                            'caption': residual_caption or "Residual history"
+                        })
+                        clear_uploader("new_residual_log")
+                        st.success(f"Residual log added: {plot['samples']:,} values in {len(plot['series'])} series")
+                        st.rerun()
+        
+        # Display current residual logs
+        if st.session_state.report_data['residual_logs']:
+            st.markdown("**Current Residual Logs:**")
+            for i, log in enumerate(st.session_state.report_data['residual_logs']):
+                col1, col2 = st.columns([4, 1])
+                with col1:
+                    name = log['file'] if isinstance(log['file'], str) else log['file'].name
+                    st.markdown(f"**{log['caption']}** ({name})")
+                with col2:
+                    if st.button("Remove", key=f"del_residual_log_{i}"):
+                        st.session_state.report_data['residual_logs'].pop(i)
+                        st.rerun()
+        
         # Governing Equations
         st.markdown("#### Governing Equations & Formulas")
         st.markdown('<div class="info-box">Add the key mathematical formulas and governing equations used in the analysis.</div>', unsafe_allow_html=True)
@@ -772,6 +3887,7 @@ def main():
                     "Formula (LaTeX or mathematical notation)",
                     formula['formula'],
                     height=100,
+                    help="Lines with `$...$` spans or TeX commands (`\\frac`, `\\nabla`, ...) are typeset as math; other lines are printed as text.",
                     key=f"formula_content_{i}"
                 )
                 
@@ -840,6 +3956,7 @@ def main():
             stats = {
                 "Result Images": len(st.session_state.report_data['result_images']),
                 "Convergence Plots": len(st.session_state.report_data['convergence_images']),
+                "Residual Logs": len(st.session_state.report_data['residual_logs']),
                 "Boundary Conditions": len(st.session_state.report_data['boundary_conditions_table']),
                 "Solution Parameters": len(st.session_state.report_data['solution_parameters']),
                 "Formulas": len([f for f in st.session_state.report_data['formulas'] if f['description']]),
@@ -849,6 +3966,29 @@ def main():
             for key, value in stats.items():
                 st.metric(key, value)
         
+        # Image resolution preset
+        st.markdown("#### Image Quality")
+        dpi_labels = list(IMAGE_DPI_PRESETS)
+        dpi_values = list(IMAGE_DPI_PRESETS.values())
+        current_dpi = st.session_state.report_data['image_dpi']
+        preset = st.selectbox(
+            "Embedded image resolution",
+            dpi_labels,
+            index=dpi_values.index(current_dpi) if current_dpi in dpi_values else 1,
+            help="Images are resampled to the physical size they are placed at in the PDF."
+        )
+        st.session_state.report_data['image_dpi'] = IMAGE_DPI_PRESETS[preset]
+        
+        estimate = estimate_image_downsampling(st.session_state.report_data)
+        if estimate['images']:
+            saved = estimate['source_bytes'] - estimate['estimated_bytes']
+            st.caption(
+                f"{estimate['images']} images: {estimate['source_pixels'] / 1e6:.1f} MP → "
+                f"{estimate['target_pixels'] / 1e6:.1f} MP, about "
+                f"{estimate['source_bytes'] / 1024 ** 2:.1f} MB → {estimate['estimated_bytes'] / 1024 ** 2:.1f} MB "
+                f"(~{saved / max(estimate['source_bytes'], 1):.0%} smaller image payload)"
+            )
+        
         # Validation checks
         st.markdown("#### Pre-Generation Checklist")
         
@@ -872,54 +4012,146 @@ def main():
         if not all_required_complete:
             st.warning("⚠️ Please complete all required sections before generating the report.")
         
+        # Dry-run layout on request: exact page count and estimated size without building
+        estimate = st.button(
+            "📐 Estimate pages and size",
+            help="Lay the report out without building it; shown until the report is edited."
+        )
+        plan = session_layout_plan(st.session_state.report_data, refresh=estimate)
+        if plan is not None:
+            size_kb = plan['estimated_bytes'] / 1024
+            size = f"{size_kb / 1024:.1f} MB" if size_kb >= 1024 else f"{size_kb:.0f} KB"
+            if plan['estimated_bytes'] > REPORT_WARN_BYTES or plan['pages'] > REPORT_WARN_PAGES:
+                st.warning(
+                    f"⚠️ Large report: {plan['pages']} pages, about {size}. "
+                    "Consider a lower image resolution or fewer figures."
+                )
+            else:
+                st.success(f"✅ Layout - {plan['pages']} pages, about {size}")
+            with st.expander("Section start pages"):
+                st.dataframe(
+                    [{'Section': label, 'Page': page} for label, page in plan['sections']],
+                    use_container_width=True
+                )
+        
         # Generate button
         st.markdown("---")
         
-        if st.button("🚀 Generate Professional CFD Report", disabled=not all_required_complete):
+        col1, col2 = st.columns(2)
+        with col1:
+            collect_profile = st.checkbox(
+                "Collect performance profile",
+                help="Record wall time, CPU time and peak memory per section and per image."
+            )
+        with col2:
+            collect_cprofile = st.checkbox("Include cProfile dump", disabled=not collect_profile)
+        
+        job = session_report_job()
+        building = job is not None and job.active
+        if st.button("🚀 Generate Professional CFD Report", disabled=not all_required_complete or building):
             if not all_required_complete:
                 st.error("Please complete all required sections first.")
                 return
             
-            with st.spinner("Generating professional PDF report... This may take a few moments."):
+            filename = f"{st.session_state.report_data['project_name'].replace(' ', '_')}_CFD_Report.pdf" if st.session_state.report_data['project_name'] else "CFD_Analysis_Report.pdf"
+            queue = report_job_queue()
+            try:
+                new_job = queue.submit(st.session_state.report_data, upload_session_id(), filename,
+                                       profile=collect_profile, cprofile=collect_cprofile)
+            except ValueError as e:
+                st.error(f"Could not start report generation: {e}")
+            else:
+                # The previous result is replaced: release its PDF
+                if job is not None:
+                    queue.remove(job.id)
+                st.session_state.report_job = new_job.id
+                st.rerun()
+        if building:
+            st.caption("A report is being generated in the background; you can keep editing, or cancel it to start another.")
+        
+        if job is not None:
+            report_job_panel(job)
+        
+        # Performance profile of the last generation (kept across reruns)
+        last_profile = st.session_state.get('last_profile')
+        if last_profile is not None:
+            st.markdown("#### ⏱️ Generation Profile")
+            total = last_profile['total']
+            st.caption(
+                f"Total: {total['wall_s']:.2f} s wall, {total['cpu_s']:.2f} s CPU"
+                + (f", {total['peak_kb'] / 1024:.1f} MB peak traced memory" if total['peak_kb'] is not None else "")
+            )
+            st.dataframe(
+                [
+                    {
+                        'Step': record['name'],
+                        'Kind': record['kind'],
+                        'Wall (ms)': round(record['wall_s'] * 1000, 1),
+                        'CPU (ms)': round(record['cpu_s'] * 1000, 1),
+                        'Peak memory (KB)': None if record['peak_kb'] is None else round(record['peak_kb'], 1),
+                    }
+                    for record in last_profile['steps']
+                ],
+                use_container_width=True
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="Download profile (JSON)",
+                    data=json.dumps({key: value for key, value in last_profile.items() if key != 'cprofile'}, indent=2),
+                    file_name="report_generation_profile.json",
+                    mime="application/json",
+                    use_container_width=True
+                )
+            with col2:
+                cprofile_data = last_profile['cprofile']
+                if cprofile_data:
+                    st.download_button(
+                        label="Download cProfile dump (.prof)",
+                        data=cprofile_data,
+                        file_name="report_generation.prof",
+                        mime="application/octet-stream",
+                        use_container_width=True
+                    )
+        
+        # Draft preview: re-render only the sections that changed, with low-res images
+        st.markdown("---")
+        st.markdown("#### ⚡ Draft Preview")
+        section_labels = {key: label for key, label, _, _ in REPORT_SECTIONS}
+        changed_option = "Sections changed since last preview"
+        preview_choice = st.selectbox(
+            "Sections to preview",
+            [changed_option] + list(section_labels.values()),
+            key="draft_preview_sections"
+        )
+        
+        if st.button("Render Draft Preview"):
+            fingerprints = section_fingerprints(st.session_state.report_data)
+            if preview_choice == changed_option:
+                previous = st.session_state.get('preview_fingerprints', {})
+                preview_keys = [key for key in fingerprints if previous.get(key) != fingerprints[key]]
+            else:
+                preview_keys = [key for key, label in section_labels.items() if label == preview_choice]
+            
+            if not preview_keys:
+                st.info("No sections changed since the last preview.")
+            else:
                 try:
-                    # Create temporary directory
-                    with tempfile.TemporaryDirectory() as temp_dir:
-                        # Generate PDF
-                        pdf = create_professional_pdf(st.session_state.report_data, temp_dir)
-                        
-                        # Save PDF to bytes
-                        pdf_output = os.path.join(temp_dir, "professional_cfd_report.pdf")
-                        pdf.output(pdf_output)
-                        
-                        # Read PDF file
-                        with open(pdf_output, "rb") as f:
-                            pdf_bytes = f.read()
-                        
-                        # Success message
-                        st.success("✅ Professional CFD report generated successfully!")
-                        
-                        # Download button
-                        filename = f"{st.session_state.report_data['project_name'].replace(' ', '_')}_CFD_Report.pdf" if st.session_state.report_data['project_name'] else "CFD_Analysis_Report.pdf"
-                        
-                        st.download_button(
-                            label="📥 Download Professional CFD Report",
-                            data=pdf_bytes,
-                            file_name=filename,
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
-                        
-                        # Additional info
-                        st.info(f"""
-                        📊 **Report Statistics:**
-                        - Total pages: ~{10 + len(st.session_state.report_data['result_images']) + len(st.session_state.report_data['convergence_images'])}
-                        - File size: {len(pdf_bytes) / 1024:.1f} KB
-                        - Generated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-                        """)
-                        
+                    start = time.perf_counter()
+                    draft_bytes = render_draft_preview(st.session_state.report_data, preview_keys)
+                    elapsed = time.perf_counter() - start
+                    st.session_state.preview_fingerprints = fingerprints
+                    
+                    st.caption(f"Draft of {', '.join(section_labels[key] for key in preview_keys)} "
+                               f"rendered in {elapsed * 1000:.0f} ms")
+                    draft_b64 = base64.b64encode(draft_bytes).decode('ascii')
+                    st.markdown(
+                        f'<iframe src="data:application/pdf;base64,{draft_b64}" width="100%" height="600" '
+                        f'type="application/pdf"></iframe>',
+                        unsafe_allow_html=True
+                    )
                 except Exception as e:
-                    st.error(f"Error generating PDF: {str(e)}")
-                    st.error("Please check that all images are valid and try again.")
+                    st.error(f"Error rendering draft preview: {str(e)}")
         
         # Tips for professional reports
         st.markdown("---")
@@ -938,5 +4170,224 @@ def main():
         for tip in tips:
             st.markdown(f"• {tip}")
 
+def load_report_spec(spec_path):
+    """Load a JSON/YAML report spec into a full report_data dict.
+
+    The spec mirrors the session-state report_data dict, except that
+    company_logo and the image and residual log 'file' entries hold file
+    paths, and tables may name a CSV file instead of listing rows.
+    'monitor_files' lists force/monitor files (paths or {'file', 'window'})
+    whose statistics are appended to solution_parameters. Relative paths
+    are resolved against the spec's directory.
+    """
+    return report_data_from_spec(read_spec(spec_path), os.path.dirname(os.path.abspath(spec_path)))
+
+def read_spec(spec_path):
+    """Parse a JSON/YAML spec file into a dict"""
+    with open(spec_path, 'r', encoding='utf-8') as f:
+        if spec_path.lower().endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("PyYAML is required to read YAML report specs")
+            spec = yaml.safe_load(f) or {}
+        else:
+            spec = json.load(f)
+    
+    if not isinstance(spec, dict):
+        raise ValueError(f"{spec_path}: report spec must be a mapping")
+    return spec
+
+def load_sweep_spec(spec_path):
+    """Load a parametric sweep spec into (base report_data, cases).
+
+    A sweep spec is a report spec (see load_report_spec) shared by all
+    cases, plus a non-empty 'cases' list. Each case has a 'name', optional
+    'parameters' and 'metrics' mappings shown in the comparison tables,
+    and any report spec fields it overrides (typically its results text,
+    images and residual logs). Each case dict holds those, with the base
+    plus its overrides as 'report_data'.
+    """
+    spec = read_spec(spec_path)
+    base_dir = os.path.dirname(os.path.abspath(spec_path))
+    case_specs = spec.pop('cases', None)
+    if not isinstance(case_specs, list) or not case_specs:
+        raise ValueError(f"{spec_path}: sweep spec needs a non-empty 'cases' list")
+    
+    cases = []
+    for number, case_spec in enumerate(case_specs, 1):
+        if not isinstance(case_spec, dict):
+            raise ValueError(f"{spec_path}: case {number} must be a mapping")
+        overrides = dict(case_spec)
+        cases.append({
+            'name': str(overrides.pop('name', None) or f"Case {number}"),
+            'parameters': overrides.pop('parameters', None) or {},
+            'metrics': overrides.pop('metrics', None) or {},
+            'report_data': report_data_from_spec(dict(spec, **overrides), base_dir),
+        })
+    return report_data_from_spec(spec, base_dir), cases
+
+def report_data_from_spec(spec, base_dir):
+    """Full report_data dict for a parsed report spec (see load_report_spec)"""
+    def resolve(path):
+        if not path:
+            return None
+        return os.path.join(base_dir, os.path.expanduser(path))
+    
+    report_data = default_report_data()
+    report_data.update(spec)
+    report_data['date'] = str(report_data['date'])
+    report_data['company_logo'] = resolve(report_data['company_logo'])
+    for key in ('result_images', 'convergence_images', 'residual_logs'):
+        images = []
+        for entry in report_data[key] or []:
+            if isinstance(entry, str):
+                entry = {'file': entry, 'caption': ''}
+            images.append({'file': resolve(entry.get('file')), 'caption': entry.get('caption', '')})
+        report_data[key] = images
+    # Tables may be given as a CSV path, streamed at render time
+    for key, columns in TABLE_COLUMNS.items():
+        if isinstance(report_data[key], str):
+            report_data[key] = CSVRows(resolve(report_data[key]), columns)
+    # Statistics of force/monitor files are appended to the solution parameters
+    monitor_files = report_data.pop('monitor_files', None) or []
+    if monitor_files:
+        parameters = list(report_data['solution_parameters'])
+        for entry in monitor_files:
+            if isinstance(entry, str):
+                entry = {'file': entry}
+            statistics = monitor_statistics(resolve(entry['file']), entry.get('window', MONITOR_WINDOW))
+            parameters += monitor_statistics_rows(statistics)
+        report_data['solution_parameters'] = parameters
+    
+    return report_data
+
+def render_report_file(spec_path, output_dir, image_workers=None, profile=False, generated_at=None):
+    """Render one report spec to <output_dir>/<spec name>.pdf (batch worker).
+
+    The PDF is streamed into the file, so memory use does not grow with
+    the report size. Unchanged reports are copied from the report cache.
+    With profile=True a ReportProfiler JSON is written next to the PDF as
+    <spec name>.profile.json. Images that could not be loaded are left out
+    of the PDF and listed in the result's 'image_errors'.
+    """
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(spec_path))[0]
+    output_path = os.path.join(output_dir, f"{name}.pdf")
+    result = {'spec': spec_path, 'output': output_path, 'pages': 0, 'size': 0, 'image_errors': [], 'error': None}
+    try:
+        report_data = load_report_spec(spec_path)
+        profiler = ReportProfiler() if profile else None
+        with profiler or contextlib.nullcontext():
+            report = build_report(report_data, generated_at, image_workers, profiler, output_path=output_path)
+        if profiler:
+            with open(os.path.join(output_dir, f"{name}.profile.json"), 'w', encoding='utf-8') as f:
+                f.write(profiler.to_json())
+        result['pages'] = report['pages']
+        result['size'] = os.path.getsize(output_path)
+        result['image_errors'] = report['image_errors']
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+def run_batch(spec_paths, output_dir, workers=None, image_workers=None, profile=False, generated_at=None):
+    """Render report specs across a process pool, yielding results as they finish"""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    # Split the cores between report processes and their image threads
+    image_workers = image_workers or max(1, (os.cpu_count() or 1) // workers)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_report_file, path, output_dir, image_workers, profile, generated_at) for path in spec_paths]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+def sweep_cli(argv):
+    """python pdfc.py sweep SWEEP_SPEC -o OUTPUT_DIR: one consolidated report over all cases"""
+    parser = argparse.ArgumentParser(
+        prog="pdfc.py sweep",
+        description="Render one comparison report over the cases of a parametric sweep spec."
+    )
+    parser.add_argument("spec", help="sweep spec file (.json, .yaml, .yml): a report spec plus a 'cases' list")
+    parser.add_argument("-o", "--output-dir", default="reports", help="directory for the generated PDF (default: reports)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes preparing case images (default: CPU count)")
+    parser.add_argument("--timestamp", type=generation_timestamp, default=None,
+                        help="generation date/time stamped into the PDF, ISO 8601 (default: today)")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit non-zero when an image could not be loaded")
+    args = parser.parse_args(argv)
+    
+    start = time.perf_counter()
+    name = os.path.splitext(os.path.basename(args.spec))[0]
+    output_path = os.path.join(args.output_dir, f"{name}.pdf")
+    try:
+        report_data, cases = load_sweep_spec(args.spec)
+        os.makedirs(args.output_dir, exist_ok=True)
+        report = build_sweep_report(report_data, cases, args.timestamp, args.jobs, output_path=output_path)
+    except Exception as e:
+        print(f"FAIL {args.spec}: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+    for error in report['image_errors']:
+        print(f"WARN image could not be loaded: {error}", file=sys.stderr)
+    print(f"OK   {output_path}: {len(cases)} cases, {report['pages']} pages, "
+          f"{os.path.getsize(output_path) / 1024:.1f} KB, {time.perf_counter() - start:.2f} s")
+    return 1 if args.strict and report['image_errors'] else 0
+
+def cli(argv=None):
+    """Headless entry point: python pdfc.py SPEC [SPEC ...] -o OUTPUT_DIR (or: sweep SWEEP_SPEC)"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['sweep']:
+        return sweep_cli(argv[1:])
+    parser = argparse.ArgumentParser(
+        description="Render VASTAS CFD reports from JSON/YAML specs without the Streamlit UI.",
+        epilog="Run 'pdfc.py sweep SWEEP_SPEC' to render one comparison report over a parametric sweep."
+    )
+    parser.add_argument("specs", nargs="+", help="report spec files (.json, .yaml, .yml)")
+    parser.add_argument("-o", "--output-dir", default="reports", help="directory for generated PDFs (default: reports)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--image-workers", type=int, default=None,
+                        help="image preprocessing threads per report (default: CPU count / jobs)")
+    parser.add_argument("--profile", action="store_true",
+                        help="write a per-section timing/memory profile next to each PDF")
+    parser.add_argument("--timestamp", type=generation_timestamp, default=None,
+                        help="generation date/time stamped into the PDFs, ISO 8601 (default: today); "
+                             "the same specs and timestamp give identical files")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit non-zero when an image could not be loaded into a report")
+    args = parser.parse_args(argv)
+    
+    workers = args.jobs or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = []
+    for result in run_batch(args.specs, args.output_dir, workers, args.image_workers, args.profile, args.timestamp):
+        results.append(result)
+        if result['error']:
+            print(f"FAIL {result['spec']}: {result['error']} ({result['seconds']:.2f} s)", file=sys.stderr)
+        else:
+            for error in result['image_errors']:
+                print(f"WARN {result['spec']}: image could not be loaded: {error}", file=sys.stderr)
+            print(f"OK   {result['output']}: {result['pages']} pages, "
+                  f"{result['size'] / 1024:.1f} KB, {result['seconds']:.2f} s")
+    elapsed = time.perf_counter() - start
+    
+    succeeded = [r for r in results if not r['error']]
+    degraded = [r for r in succeeded if r['image_errors']]
+    pages = sum(r['pages'] for r in succeeded)
+    busy = sum(r['seconds'] for r in results)
+    print(f"\nRendered {len(succeeded)}/{len(results)} reports ({len(degraded)} with missing images) "
+          f"in {elapsed:.2f} s with {workers} workers: "
+          f"{len(succeeded) / elapsed * 60:.1f} reports/min, {pages / elapsed:.1f} pages/s, "
+          f"parallel speedup {busy / elapsed:.2f}x")
+    return 0 if len(succeeded) == len(results) and not (args.strict and degraded) else 1
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    from streamlit import runtime
+    if runtime.exists():
+        main()
+    else:
+        sys.exit(cli())
+elif __name__ == "__mp_main__":
+    # Worker process started from the app, which multiprocessing runs this
+    # file in as __mp_main__: work sent to it refers to worker_module()
+    sys.modules.setdefault(os.path.splitext(os.path.basename(__file__))[0], sys.modules[__name__])
\ No newline at end of file
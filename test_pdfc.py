@@ -0,0 +1,171 @@
+"""Tests for the VASTAS CFD report generator.
+
+    python -m pytest -q
+"""
+import os
+import re
+import tempfile
+import time
+
+# Keep the conversion caches of test runs away from the user's cache
+os.environ.setdefault('PDFC_CACHE_DIR', tempfile.mkdtemp(prefix='pdfc-test-cache-'))
+
+import fpdf
+import pytest
+
+import pdfc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def version_tuple(version):
+    return tuple(int(part) for part in re.findall(r'\d+', version)[:3])
+
+def shown_text(pdf, data):
+    """Lines of text drawn with Tj in an uncompressed PDF, decoded through
+    the glyph subsets of pdf's TTF fonts"""
+    fonts = {}
+    for font in pdf.fonts.values():
+        chars = {}
+        for glyph, char_id in font.subset.items():
+            if glyph is not None:
+                codes = glyph.unicode if isinstance(glyph.unicode, tuple) else (glyph.unicode,)
+                chars[char_id] = ''.join(map(chr, codes))
+        fonts[f'F{font.i}'.encode()] = chars
+    lines = []
+    for stream in re.findall(rb'stream\n(.*?)endstream', data, re.S):
+        # Text of Form XObjects using the font of the page painting them is skipped
+        chars = None
+        for match in re.finditer(rb'/(F\d+) [\d.]+ Tf|\(((?:\\.|[^\\)])*)\) Tj', stream, re.S):
+            if match.group(1):
+                chars = fonts[match.group(1)]
+            elif chars is not None:
+                raw = re.sub(rb'\\(r|.)', lambda m: b'\r' if m.group(1) == b'r' else m.group(1), match.group(2), flags=re.S)
+                lines.append(''.join(chars[int.from_bytes(raw[i:i + 2], 'big')] for i in range(0, len(raw), 2)))
+    return '\n'.join(lines)
+
+def two_page_pdf():
+    pdf = pdfc.ProfessionalPDFGenerator()
+    pdf.set_compression(False)
+    pdf.add_page()
+    pdf.add_page()
+    return pdf, bytes(pdf.output())
+
+def test_installed_fpdf_meets_requirements():
+    with open(os.path.join(HERE, 'requirements.txt'), encoding='utf-8') as f:
+        floor = re.search(r'^fpdf2>=([\d.]+)', f.read(), re.M).group(1)
+    assert version_tuple(fpdf.__version__) >= version_tuple(floor)
+
+def test_page_chrome_shared_between_pages():
+    pdf, data = two_page_pdf()
+    assert set(pdf.chrome) == {'header', 'footer'}
+    for name in ('header', 'footer'):
+        assert data.count(f'/I{pdf.chrome[name][0]} Do'.encode()) == 2
+    # The header rule is drawn once, in its XObject
+    assert data.count(b' l S') == 1
+
+def test_page_chrome_without_form_xobjects(monkeypatch):
+    # fpdf releases before 2.8.5 lack PDFResourceType / the Form XObject catalog
+    monkeypatch.delattr('fpdf.enums.PDFResourceType')
+    pdf, data = two_page_pdf()
+    assert pdf.chrome == {}
+    assert b' Do' not in data
+    # Header rule drawn on each page itself
+    assert data.count(b' l S') == 2
+
+def test_unicode_text_printed():
+    pdf = pdfc.ProfessionalPDFGenerator()
+    pdf.set_compression(False)
+    pdf.add_page()
+    pdf.set_font('Arial', '', 11)
+    pdf.multi_cell(0, 6, 'Давление на входе: 101 325 Па ✓\nCost: 1 200 € (≈ 1 040 £)\nКод: 漢')
+    text = shown_text(pdf, bytes(pdf.output()))
+    assert 'Давление на входе: 101 325 Па ✓' in text
+    assert 'Cost: 1 200 € (≈ 1 040 £)' in text
+    # No glyph in DejaVu: printed as '?' rather than dropped
+    assert 'Код: ?' in text
+    assert not any(font.missing_glyphs for font in pdf.fonts.values())
+
+def test_formula_math_source():
+    assert pdfc.formula_math_source('where k = turbulent kinetic energy') is None
+    assert pdfc.formula_math_source('Re = U L / nu') is None
+    mixed = r'where $k = \frac{1}{2} u_i u_i$ is the turbulent kinetic energy'
+    assert pdfc.formula_math_source(mixed) == mixed
+    assert pdfc.formula_math_source(r'\nabla \cdot u = 0') == r'$\nabla \cdot u = 0$'
+
+def test_formula_box_mixed_prose_and_math():
+    pytest.importorskip('matplotlib')
+    mixed = r'where $k = \frac{1}{2} u_i u_i$ is the turbulent kinetic energy'
+    # Prose around the $...$ span is set upright, spaces kept
+    spaced = pdfc.formula_cache.get(mixed)
+    squeezed = pdfc.formula_cache.get(mixed.replace(' is the ', 'isthe'))
+    assert spaced['x1'] - spaced['x0'] > squeezed['x1'] - squeezed['x0']
+    
+    pdf = pdfc.ProfessionalPDFGenerator()
+    pdf.set_compression(False)
+    pdf.add_page()
+    pdf.add_formula_box('Turbulence', mixed + '\nwhere k = turbulent kinetic energy')
+    text = shown_text(pdf, bytes(pdf.output()))
+    assert 'where k = turbulent kinetic energy' in text
+    assert 'turbulent kinetic energy' not in text.replace('where k = turbulent kinetic energy', '')
+
+def wait_for(jobs, timeout=120):
+    deadline = time.monotonic() + timeout
+    while any(job.active for job in jobs) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+def test_report_jobs_build_in_worker_processes():
+    queue = pdfc.ReportJobQueue(workers=2)
+    report_data = dict(pdfc.default_report_data(), executive_summary='Summary of the study.')
+    jobs = [queue.submit(dict(report_data, title=f'Case {i}'), 'test', f'case{i}.pdf', profile=True)
+            for i in range(2)]
+    # Queued behind both: cancelled before a worker takes it
+    cancelled = queue.submit(report_data, 'test', 'cancelled.pdf')
+    cancelled.cancel()
+    wait_for(jobs + [cancelled])
+    
+    assert cancelled.status == 'cancelled'
+    for job in jobs:
+        assert job.status == 'done', job.error
+        assert job.result['bytes'].startswith(b'%PDF')
+        # Profiled concurrently, each in its own process
+        total = job.profile['total']
+        assert total['peak_kb'] is not None
+        assert total['cpu_s'] <= total['wall_s']
+        assert job.profile['steps']
+
+def test_palette_image_converted_band_by_band():
+    from PIL import Image
+    noise = Image.effect_noise((1037, 2050), 60).convert('RGB')
+    palette = noise.quantize(64)
+    palette.info['transparency'] = 3
+    grey = noise.convert('L')
+    for img in (palette, Image.merge('LA', (grey, grey.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))):
+        whole = img.convert('RGBA').reduce(4)
+        reduced = pdfc.convert_reduced(img, 4, band_rows=100)
+        assert reduced.mode == 'RGBA'
+        assert reduced.tobytes() == whole.tobytes()
+
+def test_plan_image_cache_entry_evicted(tmp_path, monkeypatch):
+    from PIL import Image
+    source = tmp_path / 'contour.png'
+    Image.new('RGB', (2400, 1200), 'white').save(source)
+    # Evicted between image_cache.get() and reading the entry
+    monkeypatch.setattr(pdfc.image_cache, 'get', lambda key: str(tmp_path / 'evicted.png'))
+    placeholder, info = pdfc.plan_image(str(source), max_width=1200)
+    assert (placeholder.width, placeholder.height) == (1200, 600)
+    assert info['codec'] == 'estimate' and not info['cached']
+    assert info['output_bytes'] > 0
+
+def test_table_header_kept_with_first_row(monkeypatch):
+    pdf = pdfc.ProfessionalPDFGenerator()
+    pdf.add_page()
+    drawn = []
+    draw_table_row = pdf.draw_table_row
+    def record(cells, *args, **kwargs):
+        drawn.append((pdf.page, cells[0]))
+        return draw_table_row(cells, *args, **kwargs)
+    monkeypatch.setattr(pdf, 'draw_table_row', record)
+    # Room for the header row, but not for the first body row below it
+    pdf.set_y(pdf.page_break_trigger - pdf.TABLE_HEADER_MIN_HEIGHT - 1)
+    pdf.add_table(['Parameter', 'Value'], [['Inlet velocity', '2.5 m/s'], ['Outlet pressure', '0 Pa']])
+    assert drawn[:3] == [(2, 'Parameter'), (2, 'Inlet velocity'), (2, 'Outlet pressure')]